@@ -1,50 +1,118 @@
+import os
 import streamlit as st
 from data_collection.github_api import GitHubDataCollector
 from data_collection.data_storage import DataStorage
 from metrics.calculator import MetricsCalculator
 from visualization.charts import ChartBuilder
 from query_interface.nlp_processor import NLPProcessor
-from visualization.dashboard import display_summary, load_data
+from query_interface.rag_model import VectorIndex, get_embedder
+from visualization.dashboard import display_summary, load_data, get_metrics_cache
+from metrics.cache import data_version
 
 
-token = st.secrets["github"]["key"]
+# [github] key = "..." or, for a pool rotated by remaining rate limit, keys = ["...", "..."]
+tokens = st.secrets["github"].get("keys") or [st.secrets["github"]["key"]]
+# Optional [storage] section in secrets.toml: backend = "csv" | "parquet" | "feather" | "sqlite"
+storage_backend = st.secrets.get("storage", {}).get("backend", "csv")
+# Optional [cache] section: metrics_dir = ".metrics_cache" keeps computed metrics on disk across sessions
+metrics_cache = get_metrics_cache(st.secrets.get("cache", {}).get("metrics_dir"))
+# Optional [rag] section: index_dir = ".rag_index", model = a sentence-transformers model (hashed embeddings without one)
+rag_settings = st.secrets.get("rag", {})
+# Optional [git] section: mirror_dir = ".git_mirrors" reads commits from local git mirrors instead of the API
+git_settings = st.secrets.get("git", {})
 
 
     
+@st.cache_resource
+def get_nlp_processor():
+    # Shared across reruns and sessions, so its response cache outlives a single run
+    nlp_processor = NLPProcessor()
+    nlp_processor.warm_up()
+    return nlp_processor
+
+
+@st.cache_resource
+def get_vector_index(repo_name, index_dir, model=None):
+    # One open index per repository, so the embedding model and record ids load once
+    return VectorIndex(os.path.join(index_dir, repo_name), get_embedder(model))
+
+
 st.title("Developer Performance Dashboard")
 repo_url = st.text_input("Enter GitHub Repository URL")
+full_refresh = st.checkbox("Refetch full history", value=False)
+refresh = st.button("Fetch latest data")
 
 if repo_url:
-    collector = GitHubDataCollector(token)
-    data_storage = DataStorage()
-    nlp_processor = NLPProcessor()
+    nlp_processor = get_nlp_processor()
     chart_builder = ChartBuilder()
-    progress_bar = st.progress(0)
+
+    def report_progress(counts, done, total):
+        fetched = ", ".join(f"{count} {entity.replace('_', ' ')}" for entity, count in counts.items())
+        progress_bar.progress(int(done / total * 100), text=f"Fetched {fetched}")
 
     try:
-        repo_data = collector.get_repo_data(repo_url)
-        commits_data = collector.get_commits_data(repo_url)
-        issues_data = collector.get_issues_data(repo_url)
-        forks_data = collector.get_forks_data(repo_url)
-        pull_requests_data = collector.get_pull_requests_data(repo_url)
-        reviews_data = collector.get_code_reviews_data(repo_url)
-
-        data_storage.save_data_to_csv(repo_data, f"{repo_data['name']}_repo.csv")
-        data_storage.save_data_to_csv(commits_data, f"{repo_data['name']}_commits.csv")
-        data_storage.save_data_to_csv(issues_data, f"{repo_data['name']}_issues.csv")
-        data_storage.save_data_to_csv(pull_requests_data, f"{repo_data['name']}_pull_requests.csv")
-        data_storage.save_data_to_csv(reviews_data, f"{repo_data['name']}_reviews.csv")
-
-        progress_bar.progress(100)
-
-        # Cache data and metrics
+        session = st.session_state.get("synced")
+        # Widget reruns (sidebar clicks, queries) reuse this session's data instead of collecting again
+        if refresh or session is None or session["repo_url"] != repo_url:
+            progress_bar = st.progress(0)
+            # Built only when syncing: the HTTP cache scans its directory and the sqlite store opens its tables
+            collector = GitHubDataCollector(
+                tokens, commit_source="git" if git_settings.get("mirror_dir") else "api",
+                mirror_dir=git_settings.get("mirror_dir", ".git_mirrors"), commit_numstat=git_settings.get("numstat", False)
+            )
+            data_storage = DataStorage(backend=storage_backend)
+            # Stored data is keyed by owner and name, so orgA/api and orgB/api never share files
+            repo_name = data_storage.migrate_short_name(collector._extract_repo_name(repo_url))
+            # Repos synced before only fetch what changed since their stored watermarks
+            watermarks = {} if full_refresh else data_storage.load_watermarks(repo_name)
+            collected = collector.collect_all(repo_url, progress_callback=report_progress, since=watermarks)
+            # Typed DataFrames go straight to the metrics, skipping the records round-trip
+            synced = data_storage.sync_repo_data(repo_name, collected, watermarks, as_frames=True)
+            vector_index = None
+            try:
+                # Only records that are new or changed since the last sync get embedded
+                vector_index = get_vector_index(repo_name, rag_settings.get("index_dir", ".rag_index"), rag_settings.get("model"))
+                vector_index.update_repo(synced)
+            except Exception as e:
+                # The dashboard still works without the index; questions just get no retrieved records
+                st.warning(f"Could not index the records of {repo_name} for questions: {e}")
+            progress_bar.progress(100)
+            if collector.http_cache:
+                cache_stats = collector.http_cache.stats()
+                st.caption(f"HTTP cache: {cache_stats['hits']} unchanged pages served locally, {cache_stats['misses']} fetched")
+            session = st.session_state["synced"] = {
+                "repo_url": repo_url,
+                "synced": synced,
+                "owner": collected["owner"],
+                # Row counts too: a full refresh can drop rows without moving any watermark
+                "version": data_version(
+                    synced["repo"], data_storage.load_watermarks(repo_name),
+                    rows={entity: len(records) for entity, records in synced.items() if entity != "repo"}
+                ),
+                # Rollups and sketches only change on a sync, so they are read once here, not on every rerun
+                "rollups": data_storage.rollups.load(repo_name),
+                "sketches": data_storage.rollups.sketches.load(repo_name),
+                # None when the index could not be opened: questions then get no retrieved records
+                "vector_index": vector_index,
+            }
+        synced = session["synced"]
+
+        repo_data = synced["repo"]
+        commits_data = synced["commits"]
+        issues_data = synced["issues"]
+        forks_data = synced["forks"]
+        pull_requests_data = synced["pull_requests"]
+        reviews_data = synced["reviews"]
+
+        # Metrics are looked up by (repo, data version) instead of hashing the data on every rerun
         cached_data = load_data(
-            repo_data, commits_data, issues_data, forks_data, pull_requests_data, reviews_data
+            repo_data, commits_data, issues_data, forks_data, pull_requests_data, reviews_data,
+            rollups=session["rollups"], version=session["version"], cache=metrics_cache, sketches=session["sketches"]
         )
 
         display_summary(
             repo_data,
-            collector.github.get_repo(collector._extract_repo_name(repo_url)).owner,
+            session["owner"],
             cached_data["avg_star_rating"],
             forks_data,
             cached_data["commit_frequency"],
@@ -56,7 +124,11 @@ if repo_url:
             cached_data["pr_merge_rate"],
             cached_data["avg_comments_per_pr"],
             chart_builder,
-            nlp_processor
+            nlp_processor,
+            version=session["version"],
+            contributors=cached_data["contributors"],
+            time_percentiles=cached_data["time_percentiles"],
+            vector_index=session["vector_index"]
         )
 
     except Exception as e:
@@ -0,0 +1,206 @@
+"""
+Headless batch scan of many repositories, e.g. every repository of an organization.
+
+    python batch_scan.py --org my-org
+    python batch_scan.py --repos-file repos.txt --workers 4 --backend parquet
+
+Repositories are collected one after another through a single GitHubDataCollector, so
+all of them share one HTTP cache and one rate-limit scheduler over the token pool; its
+requests run at batch priority, yielding to interactive dashboard fetches. Metrics are
+computed in a process pool while the next repository is being collected. Progress is
+kept in a state file, so an interrupted scan resumes where it stopped. Records are
+streamed page by page into storage and rollups rather than held per repository.
+
+Issue resolution and PR merge time percentiles come from each repository's stored
+quantile sketches; the organization-wide ones merge those sketches instead of
+re-reading any records.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from data_collection.github_api import GitHubDataCollector
+from data_collection.scheduler import BATCH
+from data_collection.data_storage import DataStorage, repo_key
+from metrics.engine import MetricsEngine
+from metrics.sketches import merge_into, combine, quantile_table, quantile_summary
+
+# Stored sketch -> column prefix of its percentiles in the comparison
+PERCENTILE_COLUMNS = {"issue_resolution_hours": "issue_resolution", "pr_merge_hours": "pr_merge"}
+
+def load_tokens(tokens=None):
+    """
+    Token pool from the command line, the GITHUB_TOKEN variable (comma separated) or
+    the [github] section of .streamlit/secrets.toml (keys = [...] or key = "...").
+    """
+    if tokens:
+        return tokens
+    if os.environ.get("GITHUB_TOKEN"):
+        return os.environ["GITHUB_TOKEN"].split(",")
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "rb") as f:
+            github_secrets = tomllib.load(f)["github"]
+        return github_secrets.get("keys") or [github_secrets["key"]]
+    sys.exit("No GitHub token: pass --token, set GITHUB_TOKEN or add .streamlit/secrets.toml")
+
+
+def summarize_repo(storage_dir, backend, repo_name):
+    """Compute one repository's comparison row from stored data. Runs in a worker process."""
+    data_storage = DataStorage(storage_dir, backend=backend)
+    # The rollups cover every aggregate except reviews per pull request
+    data = data_storage.load_repo(repo_name, entities=("reviews",))
+    repo_data = data["repo"]
+    rollups = data_storage.rollups.for_repo(repo_name)
+    metrics = MetricsEngine(data, rollups=rollups).compute()
+
+    def number(value):
+        return value if isinstance(value, (int, float)) else float("nan")
+
+    sketches = data_storage.rollups.sketches.load(repo_name)
+    percentiles = {}
+    for name, prefix in PERCENTILE_COLUMNS.items():
+        summary = quantile_summary(combine(sketches, name))
+        percentiles.update({f"{prefix}_{p}_hours": summary[p] for p in ("p50", "p90", "p99")})
+
+    commit_frequency = metrics.commit_frequency
+    return {
+        "repo": repo_data["full_name"],
+        "language": repo_data["language"],
+        "stars": repo_data["stargazers_count"],
+        "forks": repo_data["forks_count"],
+        "open_issues": repo_data["open_issues_count"],
+        "commits": int(rollups.total("commits")),
+        "issues": int(rollups.total("issues_opened")),
+        "pull_requests": int(rollups.total("prs_created")),
+        "reviews": int(rollups.total("reviews")),
+        "avg_commits_per_month": commit_frequency["count"].mean() if isinstance(commit_frequency, pd.DataFrame) and not commit_frequency.empty else 0,
+        "avg_issue_resolution_days": number(metrics.issue_resolution),
+        "avg_pr_merge_days": number(metrics.pr_merge_rate),
+        "avg_reviews_per_pr": number(metrics.avg_comments_per_pr),
+        **percentiles,
+    }
+
+
+def org_time_percentiles(data_storage, repo_names):
+    """
+    Monthly percentiles of every sketch across repositories (a frame with a sketch column)
+    and the overall ones per sketch, merged from the stored sketches in O(sketches).
+    repo_names are repo_key() keys, so same-named repositories of two owners both count.
+    """
+    merged = {}
+    for repo_name in repo_names:
+        merge_into(merged, data_storage.rollups.sketches.load(repo_name))
+    frames = [quantile_table(merged, name).assign(sketch=name) for name in merged]
+    monthly = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return monthly, {name: quantile_summary(combine(merged, name)) for name in merged}
+
+
+class ScanState:
+    """Completed repositories and their comparison rows, persisted after every repository."""
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.completed = json.load(f)["completed"]
+
+    def mark_done(self, repo_url, summary):
+        self.completed[repo_url] = summary
+        with open(self.path, "w") as f:
+            json.dump({"completed": self.completed}, f, indent=2, default=str)
+
+
+def run_batch(repo_urls, tokens, storage_dir="data", backend="csv", workers=4, state_path="batch_state.json",
+              commit_source="api", mirror_dir=".git_mirrors"):
+    collector = GitHubDataCollector(tokens, priority=BATCH, commit_source=commit_source, mirror_dir=mirror_dir)
+    data_storage = DataStorage(storage_dir, backend=backend)
+    state = ScanState(state_path)
+    remaining = [url for url in repo_urls if url not in state.completed]
+    print(f"{len(repo_urls)} repositories, {len(repo_urls) - len(remaining)} already done")
+
+    started = time.time()
+    scanned = 0
+
+    def record(repo_url, future):
+        nonlocal scanned
+        try:
+            state.mark_done(repo_url, future.result())
+            scanned += 1
+        except Exception as e:
+            print(f"Error computing metrics for {repo_url}: {e}")
+            return
+        elapsed_minutes = (time.time() - started) / 60
+        print(f"[{len(state.completed)}/{len(repo_urls)}] {repo_url} "
+              f"({scanned / elapsed_minutes:.1f} repos/min)")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for repo_url in remaining:
+            try:
+                repo_name = data_storage.migrate_short_name(collector._extract_repo_name(repo_url))
+                watermarks = data_storage.load_watermarks(repo_name)
+                # Pages go straight to storage, so memory does not grow with the repository
+                data_storage.stream_repo_data(repo_name, collector.stream_pages(repo_url, since=watermarks), watermarks)
+            except Exception as e:
+                # Not marked done, so the next run retries it
+                print(f"Error fetching data for {repo_url}: {e}")
+                continue
+            future = pool.submit(summarize_repo, storage_dir, backend, repo_name)
+            future.add_done_callback(lambda f, url=repo_url: record(url, f))
+
+    comparison = pd.DataFrame([state.completed[url] for url in repo_urls if url in state.completed])
+    if not comparison.empty:
+        comparison = comparison.sort_values("commits", ascending=False, ignore_index=True)
+        data_storage.save_data(comparison, "batch_comparison")
+
+        repo_names = [repo_key(collector._extract_repo_name(url)) for url in repo_urls if url in state.completed]
+        monthly, overall = org_time_percentiles(data_storage, repo_names)
+        if not monthly.empty:
+            data_storage.save_data(monthly, "batch_time_percentiles")
+        for name, summary in overall.items():
+            print(f"All repositories, {name}: p50 {summary['p50']:.1f}, p90 {summary['p90']:.1f}, "
+                  f"p99 {summary['p99']:.1f} ({summary['count']} records)")
+
+    elapsed_minutes = (time.time() - started) / 60
+    if scanned:
+        print(f"Scanned {scanned} repositories in {elapsed_minutes:.1f} min ({scanned / elapsed_minutes:.1f} repos/min)")
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect and compare metrics for many GitHub repositories.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--org", help="Scan every repository of this organization")
+    source.add_argument("--repos-file", help="File with one repository URL per line")
+    parser.add_argument("--token", action="append", dest="tokens",
+                        help="GitHub token, repeatable for a pool (defaults to GITHUB_TOKEN or .streamlit/secrets.toml)")
+    parser.add_argument("--storage-dir", default="data")
+    parser.add_argument("--backend", default="csv", choices=["csv", "parquet", "feather", "sqlite"])
+    parser.add_argument("--workers", type=int, default=4, help="Processes computing metrics")
+    parser.add_argument("--state-file", default="batch_state.json", help="Progress file used to resume")
+    parser.add_argument("--commit-source", default="api", choices=["api", "git"],
+                        help="Read commits from the REST API or from local git mirrors")
+    parser.add_argument("--mirror-dir", default=".git_mirrors", help="Where --commit-source git keeps its mirrors")
+    args = parser.parse_args()
+
+    tokens = load_tokens(args.tokens)
+    if args.org:
+        repo_urls = GitHubDataCollector(tokens, priority=BATCH).get_org_repo_urls(args.org)
+    else:
+        with open(args.repos_file) as f:
+            repo_urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    comparison = run_batch(repo_urls, tokens, args.storage_dir, args.backend, args.workers, args.state_file,
+                           args.commit_source, args.mirror_dir)
+    if not comparison.empty:
+        print(comparison.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
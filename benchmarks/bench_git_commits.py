@@ -0,0 +1,89 @@
+"""
+Benchmark of commit ingestion: the REST commits listing against a local git mirror.
+
+    python -m benchmarks.bench_git_commits [--commits 100000] [--numstat] [--latency 0.25]
+
+Builds a local repository of --commits commits with git fast-import and serves the
+same number of synthetic commits from benchmarks.github_stub. Times a full fetch
+through the REST listing, the first git sync (clone --mirror + git log) and an
+incremental git sync after 100 new commits, with the requests each one made. The stub
+waits --latency seconds per request, roughly what a page of api.github.com takes.
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from benchmarks.github_stub import GitHubStub, SyntheticRepo
+
+START = 1_500_000_000  # unix time of the first synthetic commit
+
+
+def fast_import(repo_path, first, count):
+    """Append `count` commits (each touching one file) to the main branch with git fast-import."""
+    lines = []
+    for i in range(first, first + count):
+        message = f"Change {i}\n".encode()
+        content = f"line {i}\n".encode()
+        timestamp = START + i * 600
+        lines.append(b"commit refs/heads/main\n")
+        lines.append(f"author Dev {i % 200} <dev{i % 200}@example.com> {timestamp} +0000\n".encode())
+        lines.append(f"committer Dev {i % 200} <dev{i % 200}@example.com> {timestamp} +0000\n".encode())
+        lines.append(f"data {len(message)}\n".encode() + message)
+        if i == first and first > 0:
+            lines.append(b"from refs/heads/main^0\n")
+        lines.append(f"M 644 inline src/file{i % 500}.txt\ndata {len(content)}\n".encode() + content + b"\n")
+    subprocess.run(["git", "-C", repo_path, "fast-import", "--quiet"], input=b"".join(lines), check=True)
+
+
+def requests_made(collector):
+    return sum(collector.http.request_counts.values())
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commits", type=int, default=100_000)
+    parser.add_argument("--numstat", action="store_true", help="also read per-commit additions and deletions")
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds the stub waits before each GET")
+    args = parser.parse_args()
+
+    from data_collection.github_api import GitHubDataCollector
+
+    with tempfile.TemporaryDirectory(prefix="bench_git_") as work_dir:
+        source = os.path.join(work_dir, "source.git")
+        subprocess.run(["git", "init", "--quiet", "--bare", "--initial-branch=main", source], check=True)
+        build_time, _ = timed(lambda: fast_import(source, 0, args.commits))
+        print(f"Built a {args.commits}-commit repository in {build_time:.1f}s")
+
+        repo = SyntheticRepo(commits=args.commits, issues=0, pull_requests=1, reviews_per_pr=0, forks=0,
+                             clone_url=source)
+        with GitHubStub([repo], latency=args.latency) as stub:
+            collector_args = dict(base_url=stub.base_url, cache_dir=os.path.join(work_dir, "http_cache"))
+            api = GitHubDataCollector(["bench-token"], **collector_args)
+            api_time, api_commits = timed(lambda: api.get_commits_data(f"https://github.com/{repo.full_name}"))
+            print(f"REST listing:     {len(api_commits):>8} commits in {api_time:7.2f}s, {requests_made(api)} requests")
+
+            git = GitHubDataCollector(["bench-token"], commit_source="git", commit_numstat=args.numstat,
+                                      mirror_dir=os.path.join(work_dir, "mirrors"), **collector_args)
+            git_time, git_commits = timed(lambda: git.get_commits_data(f"https://github.com/{repo.full_name}"))
+            print(f"git first sync:   {len(git_commits):>8} commits in {git_time:7.2f}s, {requests_made(git)} requests "
+                  f"({api_time / git_time:.1f}x faster)")
+
+            fast_import(source, args.commits, 100)
+            # Incremental syncs start from the newest stored commit
+            since = datetime.fromisoformat(git_commits[0]["date"]).astimezone(timezone.utc)
+            repo_data = git._get_repo(f"https://github.com/{repo.full_name}")
+            incremental_time, new_commits = timed(lambda: git._fetch_commits(repo_data, since=since))
+            print(f"git incremental:  {len(new_commits):>8} commits in {incremental_time:7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
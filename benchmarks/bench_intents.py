@@ -0,0 +1,87 @@
+"""
+Check of the local intent classifier's thresholds against a table of phrasings.
+
+    python -m benchmarks.bench_intents [--min-scores 0.35 0.45 0.55] [--margins 0.05 0.1 0.2] [--assert-cases]
+
+Classifies every phrasing of INTENT_CASES for each (min_score, margin) pair, reports how many get their expected intent and lists the
+misrouted ones for the classifier's defaults. --assert-cases exits non-zero if the
+defaults misroute any case.
+"""
+
+import sys
+import time
+import argparse
+from query_interface.nlp_processor import IntentClassifier
+
+# Queries and the intent each should get (None: left to the LLM)
+INTENT_CASES = [
+    ("how often are commits made", "commit_frequency"),
+    ("How many commits are there?", "commit_frequency"),
+    ("how often do we commit", "commit_frequency"),
+    ("commits per week", "commit_frequency"),
+    ("show the commit activity", "commit_frequency"),
+    ("how long does it take to close issues", "issue_resolution"),
+    ("how fast do bugs get fixed", "issue_resolution"),
+    ("how long do issues stay open", "issue_resolution"),
+    ("how quickly are PRs merged", "pr_merge_rate"),
+    ("how many pull requests get merged", "pr_merge_rate"),
+    ("time to merge a PR", "pr_merge_rate"),
+    ("how many reviews does each PR get", "code_review_metrics"),
+    ("how active are code reviews", "code_review_metrics"),
+    ("tell me about the commit messages", None),
+    ("what was the latest commit", None),
+    ("who made the most commits", None),
+    ("who reviewed the most pull requests", None),
+    ("list the open issues", None),
+    ("what language is this repo written in", None),
+    ("hello", None),
+    ("number of issues", None),
+    ("how many issues", None),
+    ("number of reviews", None),
+    ("number of forks", None),
+    ("number of stars", None),
+    ("number of contributors", None),
+    ("number of pull requests", None),
+    ("how many issues are still open", None),
+    ("what is the number of stars?", None),
+    ("how many forks does it have", None),
+]
+
+
+def misrouted(classifier, cases=INTENT_CASES):
+    """(query, expected, got) of every case the classifier gets wrong."""
+    wrong = []
+    for query, expected in cases:
+        got = classifier.classify(query.lower())
+        if got != expected:
+            wrong.append((query, expected, got))
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--min-scores", type=float, nargs="+", default=[0.35, 0.45, 0.55])
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.05, 0.1, 0.2])
+    parser.add_argument("--assert-cases", action="store_true", help="Fail if the default thresholds misroute a case")
+    args = parser.parse_args()
+
+    print(f"{len(INTENT_CASES)} cases")
+    for min_score in args.min_scores:
+        for margin in args.margins:
+            wrong = misrouted(IntentClassifier(min_score=min_score, margin=margin))
+            print(f"min_score {min_score:.2f}, margin {margin:.2f}: {len(INTENT_CASES) - len(wrong)} correct")
+
+    classifier = IntentClassifier()
+    started = time.perf_counter()
+    wrong = misrouted(classifier)
+    elapsed = time.perf_counter() - started
+    print(f"defaults (min_score {classifier.min_score}, margin {classifier.margin}): "
+          f"{len(wrong)} misrouted, {elapsed / len(INTENT_CASES) * 1e6:.0f} us per query")
+    for query, expected, got in wrong:
+        print(f"  {query!r}: expected {expected}, got {got}")
+    if args.assert_cases and wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
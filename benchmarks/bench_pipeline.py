@@ -0,0 +1,208 @@
+"""
+End-to-end benchmark of the dashboard pipeline against the offline GitHub stub.
+
+    python -m benchmarks.bench_pipeline [--records 1000 100000 1000000] [--backend csv]
+        [--review-mode rest] [--stream] [--assert-requests] [--save results.json] [--compare baseline.json]
+
+For every scale, a synthetic repository is served by benchmarks.github_stub and a fresh
+child process runs the pipeline the dashboard runs: GitHubDataCollector.collect_all,
+DataStorage.sync_repo_data, every MetricsCalculator metric and the ChartBuilder figures
+(serialized, as Streamlit sends them). Each stage reports wall time, the GitHub requests
+it made and the process's peak RSS so far. With --stream, collection and storage run
+as stream_pages + stream_repo_data and the metrics read the stored data back.
+
+--save writes the results as JSON; --compare checks them against such a file and exits
+with status 1 when a stage got slower, or used more requests or memory, than
+--tolerance allows.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import requests
+from benchmarks.github_stub import GitHubStub, SyntheticRepo
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where the resource module is missing)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class StageTimer:
+    """Wall time, stub requests and peak RSS of each stage, in run order."""
+
+    def __init__(self, stats_url):
+        self.stats_url = stats_url
+        self.stages = []
+
+    def _requests(self):
+        return requests.get(self.stats_url, timeout=10).json()["requests"]
+
+    def run(self, name, function):
+        requests_before = self._requests()
+        started = time.perf_counter()
+        result = function()
+        self.stages.append({
+            "stage": name,
+            "seconds": round(time.perf_counter() - started, 3),
+            "requests": self._requests() - requests_before,
+            "peak_rss_mb": peak_rss_mb(),
+        })
+        return result
+
+
+def run_pipeline(base_url, full_name, backend, review_mode, stream, work_dir, assert_requests=False):
+    """Run every stage once against the stub; returns the StageTimer's stages."""
+    from data_collection.github_api import GitHubDataCollector
+    from data_collection.data_storage import DataStorage, repo_key
+    from metrics.calculator import MetricsCalculator
+    from visualization.charts import ChartBuilder
+
+    repo_url = f"https://github.com/{full_name}"
+    repo_name = repo_key(full_name)
+    collector = GitHubDataCollector(
+        ["bench-token"], cache_dir=os.path.join(work_dir, "http_cache"), base_url=base_url,
+        graphql_url=f"{base_url}/graphql", review_mode=review_mode, assert_requests=assert_requests
+    )
+    storage = DataStorage(storage_dir=os.path.join(work_dir, "data"), backend=backend)
+    timer = StageTimer(f"{base_url}/_stub/stats")
+
+    if stream:
+        timer.run("collect+store", lambda: storage.stream_repo_data(repo_name, collector.stream_pages(repo_url)))
+        data = timer.run("load", lambda: storage.load_repo(repo_name))
+    else:
+        collected = timer.run("collect", lambda: collector.collect_all(repo_url))
+        data = timer.run("store", lambda: storage.sync_repo_data(repo_name, collected, as_frames=True))
+        del collected
+
+    def compute_metrics():
+        calculator = MetricsCalculator(data)
+        return calculator, {
+            "commit_frequency": calculator.calculate_commit_frequency(),
+            "issue_resolution": calculator.calculate_issue_resolution_time(),
+            "issue_counts_by_month": calculator.calculate_issue_counts_by_month(),
+            "issue_pie_chart_data": calculator.calculate_issue_pie_chart_data(),
+            "pr_merge_rate": calculator.calculate_pr_merge_rate(data["pull_requests"]),
+            "avg_comments_per_pr": calculator.calculate_code_review_metrics(data["reviews"]),
+        }
+
+    calculator, metrics = timer.run("metrics", compute_metrics)
+
+    def build_charts():
+        chart_builder = ChartBuilder()
+        figures = [
+            chart_builder.plot_commit_frequency(metrics["commit_frequency"]),
+            chart_builder.plot_issue_count_by_month(metrics["issue_counts_by_month"]),
+            chart_builder.plot_issue_pie_chart(metrics["issue_pie_chart_data"]),
+            chart_builder.visualize_metrics(calculator.engine.pull_requests, calculator.engine.issues),
+        ]
+        return sum(len(figure.to_json()) for figure in figures)
+
+    timer.run("charts", build_charts)
+    return timer.stages
+
+
+def run_scale(records, args):
+    """Serve a repository of `records` records and benchmark it in a fresh child process."""
+    repo = SyntheticRepo.from_total(records)
+    with GitHubStub([repo], rate_limit=args.rate_limit, latency=args.latency) as stub, \
+            tempfile.TemporaryDirectory(prefix="bench_pipeline_") as work_dir:
+        command = [
+            sys.executable, "-m", "benchmarks.bench_pipeline", "--child",
+            "--base-url", stub.base_url, "--repo", repo.full_name, "--backend", args.backend,
+            "--review-mode", args.review_mode, "--work-dir", work_dir,
+        ] + (["--stream"] if args.stream else []) + (["--assert-requests"] if args.assert_requests else [])
+        # Collector progress goes to stderr; the last stdout line is the JSON result
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        stages = json.loads(output.strip().splitlines()[-1])
+    return {"records": records, "counts": repo.record_counts(), "stages": stages}
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages for stages that got slower or heavier than the baseline allows."""
+    previous = {(run["records"], stage["stage"]): stage for run in baseline for stage in run["stages"]}
+    regressions = []
+    for run in results:
+        for stage in run["stages"]:
+            before = previous.get((run["records"], stage["stage"]))
+            if not before:
+                continue
+            for field in ("seconds", "requests", "peak_rss_mb"):
+                old, new = before.get(field), stage.get(field)
+                # Sub-100ms timings are noise, not regressions
+                if old is None or new is None or (field == "seconds" and new < 0.1):
+                    continue
+                if new > old * (1 + tolerance):
+                    regressions.append(f"{run['records']:>9} {stage['stage']:<14} {field}: {old} -> {new}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'records':>9} {'stage':<14} {'seconds':>9} {'requests':>9} {'peak RSS MB':>12}")
+    for run in results:
+        for stage in run["stages"]:
+            rss = f"{stage['peak_rss_mb']:.0f}" if stage["peak_rss_mb"] is not None else "n/a"
+            print(f"{run['records']:>9} {stage['stage']:<14} {stage['seconds']:>9.2f} {stage['requests']:>9} {rss:>12}")
+        total = sum(stage["seconds"] for stage in run["stages"])
+        print(f"{run['records']:>9} {'total':<14} {total:>9.2f} {sum(s['requests'] for s in run['stages']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--backend", default="csv", choices=["csv", "parquet", "feather", "sqlite"])
+    parser.add_argument("--review-mode", default="rest", choices=["rest", "graphql"])
+    parser.add_argument("--stream", action="store_true", help="collect with stream_pages + stream_repo_data")
+    parser.add_argument("--assert-requests", action="store_true",
+                        help="fail unless every entity costs exactly one request per page")
+    parser.add_argument("--rate-limit", type=int, default=1_000_000_000, help="stub requests per token and hour")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stub waits before each GET")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from --save to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    # Used by the parent to run one scale in a fresh process
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--repo", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.stdout, progress = sys.stderr, sys.stdout  # Keep the pipeline's prints off the result line
+        stages = run_pipeline(args.base_url, args.repo, args.backend, args.review_mode, args.stream, args.work_dir,
+                              args.assert_requests)
+        progress.write(json.dumps(stages) + "\n")
+        return
+
+    results = []
+    for records in args.records:
+        print(f"Benchmarking {records} records ({args.backend} storage, {args.review_mode} reviews"
+              f"{', streamed' if args.stream else ''})...", flush=True)
+        results.append(run_scale(records, args))
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against the baseline:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark of ChartBuilder.visualize_metrics resampling on synthetic data.
+
+    python -m benchmarks.bench_visualize_metrics [--prs 100000] [--issues 50000]
+
+Compares the per-bucket apply of the previous implementation with the grouped
+counts and sums of visualization.charts.periodic_metrics, checks that both give the same
+series (bucket labels and values) and reports the timing of the full figure for several periods at once.
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from visualization.charts import ChartBuilder, periodic_metrics, calculate_merge_rate
+
+
+def synthetic_data(pr_count, issue_count, years=8, seed=0):
+    """PRs (about 70% merged) and issues with resolution times, spread over `years`."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2016-01-01", tz="UTC")
+    span = pd.Timedelta(days=365 * years)
+
+    created = start + pd.to_timedelta(rng.random(pr_count) * span / pd.Timedelta(seconds=1), unit="s")
+    merged_at = pd.Series(created + pd.to_timedelta(rng.exponential(3, pr_count), unit="D"))
+    merged_at[rng.random(pr_count) > 0.7] = pd.NaT
+    pr_df = pd.DataFrame({"created_at": created, "merged_at": merged_at})
+
+    issue_created = start + pd.to_timedelta(rng.random(issue_count) * span / pd.Timedelta(seconds=1), unit="s")
+    resolution = pd.Series(rng.exponential(10, issue_count).round())
+    resolution[rng.random(issue_count) > 0.8] = np.nan
+    issue_df = pd.DataFrame({"created_at": issue_created, "resolution_time": resolution})
+    return pr_df, issue_df
+
+
+# Resample rules of the same buckets (pandas 3 spells month and quarter ends "ME" / "QE")
+RESAMPLE_RULES = {"D": "D", "W": "W", "M": "ME", "Q": "QE", "Y": "YE"}
+
+
+def legacy_series(pr_df, issue_df, period):
+    """The series of the previous visualize_metrics (run on copies, as it mutated its inputs)."""
+    pr_df, issue_df = pr_df.copy(), issue_df.copy()
+    period = RESAMPLE_RULES[period]
+    pr_df['created_at'] = pd.to_datetime(pr_df['created_at'])
+    pr_df.set_index('created_at', inplace=True)
+    pr_periodic = pr_df.resample(period).apply(lambda df: pd.Series({'merge_rate': calculate_merge_rate(df)}))
+    issue_df['created_at'] = pd.to_datetime(issue_df['created_at'])
+    issue_df.set_index('created_at', inplace=True)
+    issue_periodic = issue_df.resample(period)['resolution_time'].mean()
+    return pr_periodic, issue_periodic
+
+
+def timed(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prs", type=int, default=100_000)
+    parser.add_argument("--issues", type=int, default=50_000)
+    parser.add_argument("--periods", nargs="+", default=["W", "M", "Q"])
+    args = parser.parse_args()
+
+    pr_df, issue_df = synthetic_data(args.prs, args.issues)
+    print(f"{args.prs} PRs, {args.issues} issues")
+    for period in args.periods:
+        legacy_time, (legacy_prs, legacy_issues) = timed(lambda: legacy_series(pr_df, issue_df, period))
+        vectorized_time, series = timed(lambda: periodic_metrics(pr_df, issue_df, [period]))
+        prs, issues = series[period]
+        # The x positions of the points must match too, not only their values
+        same = legacy_prs.index.equals(prs.index) and legacy_issues.index.equals(issues.index) \
+            and np.allclose(legacy_prs['merge_rate'].to_numpy(dtype=float), prs['merge_rate'].to_numpy(dtype=float)) \
+            and np.allclose(legacy_issues.to_numpy(), issues.to_numpy(), equal_nan=True)
+        print(f"period {period:>2}: legacy {legacy_time * 1000:8.1f} ms, vectorized {vectorized_time * 1000:6.1f} ms "
+              f"({legacy_time / vectorized_time:5.1f}x), {len(prs)} buckets, same result: {same}")
+
+    figure_time, _ = timed(lambda: ChartBuilder().visualize_metrics(pr_df, issue_df, period=args.periods))
+    print(f"visualize_metrics for {', '.join(args.periods)} in one figure: {figure_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+"""
+Offline stand-in for the GitHub REST and GraphQL APIs, serving synthetic repositories.
+
+    python -m benchmarks.github_stub [--records 100000] [--port 8000]
+
+Serves the endpoints GitHubDataCollector uses (repository, owner, organization repos,
+commits, issues, forks, pulls and single pulls, reviews and the pull request GraphQL query) with GitHub's
+pagination (per_page, page and Link headers), since / sort / direction filters, ETags
+with 304 Not Modified, and per-token X-RateLimit-* headers that turn into 403s when a
+token's budget runs out. GET /_stub/stats returns the request counters.
+
+Records are generated up front as numpy arrays with a fixed seed and only rendered to
+JSON page by page, so a million-record repository costs a few megabytes.
+"""
+
+import json
+import time
+import socket
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs, urlencode
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+
+# Share of a record total given to each entity by SyntheticRepo.from_total
+ENTITY_SHARES = {"commits": 0.4, "issues": 0.2, "pull_requests": 0.15, "reviews": 0.2, "forks": 0.05}
+
+# GitHub's page size limits
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+
+
+def _iso(seconds):
+    return datetime.fromtimestamp(int(seconds), timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _iso_or_none(seconds):
+    return _iso(seconds) if seconds >= 0 else None
+
+
+def _parse_iso(value):
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+class SyntheticRepo:
+    """
+    A repository with `commits` commits, `issues` issues, `pull_requests` PRs (sharing the
+    issue number space, as on GitHub), about reviews_per_pr reviews per PR and `forks` forks,
+    spread over `years` before `end`. Timestamps are unix seconds; -1 means not set.
+    clone_url is what the repository resource reports (e.g. a local git repository).
+    """
+
+    def __init__(self, owner="octo", name="bench", commits=1000, issues=500, pull_requests=300,
+                 reviews_per_pr=1.5, forks=50, contributors=200, years=5, end="2025-01-01", seed=0, clone_url=None):
+        self.owner = owner
+        self.name = name
+        self.full_name = f"{owner}/{name}"
+        # A local repository's path lets the git commit source run offline too
+        self.clone_url = clone_url or f"https://github.com/{self.full_name}.git"
+        self.contributors = contributors
+        rng = np.random.default_rng(seed)
+        end = _parse_iso(f"{end}T00:00:00Z")
+        start = end - int(years * 365 * 86400)
+        self.created_at = start
+
+        def dates(n):
+            return np.sort(rng.integers(start, end, n))
+
+        self.commit_dates = dates(commits)
+        self.commit_authors = rng.zipf(1.5, commits) % contributors
+
+        # Issues and PRs share numbers 1..total in creation order, as on GitHub
+        total = issues + pull_requests
+        self.item_created = dates(total)
+        resolution = rng.exponential(10 * 86400, total).astype(np.int64)
+        closed = rng.random(total) < 0.8
+        self.item_closed = np.where(closed, self.item_created + resolution, -1)
+        self.item_updated = np.maximum(self.item_created + rng.integers(0, 86400, total), self.item_closed)
+        self.item_updated = np.minimum(self.item_updated, end)
+        self.item_closed = np.where(self.item_closed > end, -1, self.item_closed)
+        self.item_users = rng.zipf(1.5, total) % contributors
+        self.is_pr = np.zeros(total, dtype=bool)
+        self.is_pr[rng.choice(total, pull_requests, replace=False)] = True
+        self.pr_items = np.flatnonzero(self.is_pr)  # item index of each PR, by number
+        self.pr_merged = np.where(
+            (self.item_closed[self.pr_items] >= 0) & (rng.random(pull_requests) < 0.85),
+            self.item_closed[self.pr_items], -1
+        )
+
+        self.review_counts = rng.poisson(reviews_per_pr, pull_requests)
+        self.review_offsets = np.concatenate([[0], np.cumsum(self.review_counts)])
+        self.review_users = rng.zipf(1.5, int(self.review_offsets[-1])) % contributors
+
+        self.fork_dates = dates(forks)
+        self._orders = {}  # listing params -> (indices, render)
+        self._orders_lock = threading.Lock()
+
+    @classmethod
+    def from_total(cls, records, **kwargs):
+        """A repository with about `records` records split by ENTITY_SHARES."""
+        pull_requests = max(int(records * ENTITY_SHARES["pull_requests"]), 1)
+        return cls(
+            commits=int(records * ENTITY_SHARES["commits"]),
+            issues=int(records * ENTITY_SHARES["issues"]),
+            pull_requests=pull_requests,
+            reviews_per_pr=records * ENTITY_SHARES["reviews"] / pull_requests,
+            forks=int(records * ENTITY_SHARES["forks"]),
+            **kwargs
+        )
+
+    def record_counts(self):
+        return {
+            "commits": len(self.commit_dates),
+            "issues": int((~self.is_pr).sum()),
+            "pull_requests": len(self.pr_items),
+            "reviews": int(self.review_offsets[-1]),
+            "forks": len(self.fork_dates),
+        }
+
+    # Resources, in GitHub's JSON shapes (only the fields clients are likely to read)
+
+    def repository(self, base_url):
+        return {
+            "id": 1, "name": self.name, "full_name": self.full_name, "description": "Synthetic repository",
+            "language": "Python", "created_at": _iso(self.created_at), "updated_at": _iso(self.commit_dates.max(initial=0)),
+            "stargazers_count": 1200, "forks_count": len(self.fork_dates),
+            "open_issues_count": int((self.item_closed < 0).sum()), "archived": False,
+            "owner": {"login": self.owner, "avatar_url": f"{base_url}/avatars/{self.owner}"},
+            "html_url": f"https://github.com/{self.full_name}", "clone_url": self.clone_url,
+        }
+
+    def user(self, login, base_url):
+        return {
+            "login": login, "id": 1, "name": login.title(), "bio": None, "public_repos": 1, "followers": 10,
+            "following": 0, "avatar_url": f"{base_url}/avatars/{login}", "html_url": f"https://github.com/{login}",
+        }
+
+    def commit(self, i):
+        sha = hashlib.sha1(f"{self.full_name}:{i}".encode()).hexdigest()
+        author = {"name": f"dev{self.commit_authors[i]}", "email": f"dev{self.commit_authors[i]}@example.com",
+                  "date": _iso(self.commit_dates[i])}
+        return {"sha": sha, "commit": {"author": author, "committer": author, "message": f"Change {i}"},
+                "author": {"login": f"dev{self.commit_authors[i]}"}}
+
+    def issue(self, i):
+        number = int(i) + 1
+        record = {
+            "id": 10_000_000 + number, "number": number, "title": f"Item {number}",
+            "state": "closed" if self.item_closed[i] >= 0 else "open",
+            "user": {"login": f"dev{self.item_users[i]}"},
+            "created_at": _iso(self.item_created[i]), "updated_at": _iso(self.item_updated[i]),
+            "closed_at": _iso_or_none(self.item_closed[i]),
+        }
+        if self.is_pr[i]:
+            record["pull_request"] = {"url": f"repos/{self.full_name}/pulls/{number}"}
+        return record
+
+    def pull_request(self, j):
+        record = self.issue(self.pr_items[j])
+        record.pop("pull_request")
+        record["id"] = 20_000_000 + record["number"]
+        record["merged_at"] = _iso_or_none(self.pr_merged[j])
+        return record
+
+    def pr_ordinal(self, number):
+        """Index of the PR with this issue number among the PRs, or None if it is an issue."""
+        j = int(np.searchsorted(self.pr_items, number - 1))
+        return j if j < len(self.pr_items) and self.pr_items[j] == number - 1 else None
+
+    def pull_request_detail(self, number):
+        """The single-PR resource, with the fields the list endpoint leaves out."""
+        j = self.pr_ordinal(number)
+        if j is None:
+            return None
+        return {**self.pull_request(j), "merged": bool(self.pr_merged[j] >= 0), "comments": 0, "review_comments": 0}
+
+    def review(self, j, k):
+        """The k-th review of PR j, submitted k + 1 hours after the PR was opened."""
+        review_id = self.review_offsets[j] + k
+        return {
+            "id": 30_000_000 + int(review_id), "user": {"login": f"dev{self.review_users[review_id]}"},
+            "body": f"Review {review_id}", "state": "APPROVED",
+            "submitted_at": _iso(self.item_created[self.pr_items[j]] + (k + 1) * 3600),
+        }
+
+    def reviews(self, j):
+        return [self.review(j, k) for k in range(self.review_counts[j])]
+
+    def fork(self, i):
+        login = f"forker{i}"
+        return {"id": 40_000_000 + int(i), "full_name": f"{login}/{self.name}", "created_at": _iso(self.fork_dates[i]),
+                "owner": {"login": login, "avatar_url": f"https://avatars.example.com/{login}"}}
+
+    # List views: the indices a list request returns, in order
+
+    def list_indices(self, kind, params, number=None):
+        """(indices, render) of a list endpoint for the request params."""
+        if kind == "reviews":
+            j = self.pr_ordinal(number)
+            if j is None:
+                return None, None
+            return np.arange(self.review_counts[j]), lambda k: self.review(j, k)
+
+        # Every page of a listing shares its order, so it is computed once per listing
+        key = (kind,) + tuple(sorted((name, value) for name, value in params.items() if name not in ("page", "per_page")))
+        with self._orders_lock:
+            if key not in self._orders:
+                if len(self._orders) >= 64:
+                    self._orders.clear()
+                self._orders[key] = self._list_order(kind, params)
+            return self._orders[key]
+
+    def _list_order(self, kind, params):
+        if kind == "commits":
+            order = np.arange(len(self.commit_dates))[::-1]  # newest first
+            if "since" in params:
+                order = order[self.commit_dates[order] >= _parse_iso(params["since"])]
+            if "until" in params:
+                order = order[self.commit_dates[order] <= _parse_iso(params["until"])]
+            return order, self.commit
+
+        if kind in ("issues", "pulls"):
+            items = np.arange(len(self.item_created)) if kind == "issues" else self.pr_items
+            sort_keys = {"created": self.item_created, "updated": self.item_updated}
+            order = np.argsort(sort_keys.get(params.get("sort"), self.item_created)[items], kind="stable")
+            if params.get("direction", "desc") == "desc":
+                order = order[::-1]
+            state = params.get("state", "open")
+            closed = self.item_closed[items[order]] >= 0
+            if state == "open":
+                order = order[~closed]
+            elif state == "closed":
+                order = order[closed]
+            if kind == "issues" and "since" in params:
+                order = order[self.item_updated[items[order]] >= _parse_iso(params["since"])]
+            if kind == "issues":
+                return items[order], self.issue
+            return order, self.pull_request
+
+        if kind == "forks":
+            order = np.arange(len(self.fork_dates))
+            if params.get("sort", "newest") == "newest":
+                order = order[::-1]
+            return order, self.fork
+        return None, None
+
+    def graphql_pull_requests(self, cursor, page_size):
+        """The PULL_REQUESTS_QUERY connection: PRs by most recent update, reviews inlined."""
+        order, _ = self.list_indices("pulls", {"state": "all", "sort": "updated", "direction": "desc"})
+        start = int(cursor or 0)
+        nodes = []
+        for j in order[start:start + page_size]:
+            pr = self.pull_request(j)
+            reviews = self.reviews(j)
+            nodes.append({
+                "databaseId": pr["id"], "number": pr["number"], "title": pr["title"],
+                "createdAt": pr["created_at"], "updatedAt": pr["updated_at"], "mergedAt": pr["merged_at"],
+                "author": pr["user"],
+                "reviews": {
+                    "pageInfo": {"hasNextPage": len(reviews) > 100},
+                    "nodes": [{"databaseId": r["id"], "author": r["user"], "submittedAt": r["submitted_at"],
+                               "body": r["body"]} for r in reviews[:100]],
+                },
+            })
+        end = start + len(nodes)
+        return {"pageInfo": {"hasNextPage": end < len(order), "endCursor": str(end)}, "nodes": nodes}
+
+
+class RateLimiter:
+    """Per-token, per-resource budgets reported like GitHub's X-RateLimit-* headers."""
+
+    def __init__(self, limit=5000, window=3600):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._budgets = {}  # (token, resource) -> [remaining, reset]
+
+    def take(self, token, resource, cost=1):
+        """Spend cost from the token's budget; returns (allowed, headers)."""
+        now = int(time.time())
+        with self._lock:
+            budget = self._budgets.setdefault((token, resource), [self.limit, now + self.window])
+            if budget[1] <= now:
+                budget[:] = [self.limit, now + self.window]
+            allowed = budget[0] >= cost
+            if allowed:
+                budget[0] -= cost
+            remaining, reset = budget
+        return allowed, {
+            "X-RateLimit-Limit": str(self.limit), "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Used": str(self.limit - remaining), "X-RateLimit-Reset": str(reset),
+            "X-RateLimit-Resource": resource,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like api.github.com
+    server_version = "GitHubStub/1.0"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this, Nagle's algorithm and
+        # delayed ACKs add ~40ms to every keep-alive response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def stub(self):
+        return self.server.stub
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _authorize(self, resource):
+        token = self.headers.get("Authorization", "anonymous")
+        allowed, headers = self.stub.rate_limiter.take(token, resource)
+        if not allowed:
+            self.stub.count("rate_limited", 403)
+            self._send_json(403, {"message": "API rate limit exceeded for this token."}, headers)
+        return allowed, headers
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["_stub", "stats"]:
+            return self._send_json(200, self.stub.stats())
+
+        kind, body, headers = self.stub.resolve(parts, params, self._base_url())
+        if body is None:
+            self.stub.count(kind, 404)
+            return self._send_json(404, {"message": "Not Found"})
+
+        payload = json.dumps(body).encode()
+        etag = f'W/"{hashlib.sha1(payload).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            # Conditional requests answered with 304 do not count against the rate limit
+            self.stub.count(kind, 304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        allowed, rate_headers = self._authorize("core")
+        if not allowed:
+            return
+        self.stub.count(kind, 200)
+        self._send_json(200, body, {**rate_headers, **headers, "ETag": etag})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if urlparse(self.path).path.rstrip("/") != "/graphql":
+            self.stub.count("post", 404)
+            return self._send_json(404, {"message": "Not Found"})
+        allowed, rate_headers = self._authorize("graphql")
+        if not allowed:
+            return
+        self.stub.count("graphql", 200)
+        self._send_json(200, self.stub.graphql(payload), rate_headers)
+
+    def _base_url(self):
+        return f"http://{self.headers.get('Host', '%s:%d' % self.server.server_address[:2])}"
+
+
+class GitHubStub:
+    """
+    Serves SyntheticRepos over HTTP on a background thread. Use as a context manager;
+    point GitHubDataCollector at base_url and graphql_url.
+    """
+
+    def __init__(self, repos, host="127.0.0.1", port=0, rate_limit=1_000_000_000, latency=0.0):
+        self.repos = {repo.full_name: repo for repo in repos}
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._counts = {}
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def graphql_url(self):
+        return f"{self.base_url}/graphql"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, kind, status):
+        with self._lock:
+            key = f"{kind} {status}"
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def stats(self):
+        """Requests served, in total and per "<endpoint> <status>"."""
+        with self._lock:
+            counts = dict(self._counts)
+        return {"requests": sum(counts.values()), "by_endpoint": counts}
+
+    def resolve(self, parts, params, base_url):
+        """(endpoint kind, JSON body or None, extra headers) of a GET path."""
+        if self.latency:
+            time.sleep(self.latency)
+        if len(parts) == 2 and parts[0] == "users":
+            repo = next((r for r in self.repos.values() if r.owner == parts[1]), None)
+            return "users", repo.user(parts[1], base_url) if repo else None, {}
+        if len(parts) == 3 and parts[0] == "orgs" and parts[2] == "repos":
+            repos = [r.repository(base_url) for r in self.repos.values() if r.owner == parts[1]]
+            return self._page("orgs", np.arange(len(repos)), repos.__getitem__, params, parts, base_url) \
+                if repos else ("orgs", None, {})
+        if len(parts) < 3 or parts[0] != "repos":
+            return "unknown", None, {}
+
+        repo = self.repos.get(f"{parts[1]}/{parts[2]}")
+        if repo is None:
+            return "repos", None, {}
+        if len(parts) == 3:
+            return "repos", repo.repository(base_url), {}
+        if len(parts) == 4 and parts[3] in ("commits", "issues", "pulls", "forks"):
+            indices, render = repo.list_indices(parts[3], params)
+            return self._page(parts[3], indices, render, params, parts, base_url)
+        if len(parts) == 5 and parts[3] == "pulls" and parts[4].isdigit():
+            return "pull", repo.pull_request_detail(int(parts[4])), {}
+        if len(parts) == 6 and parts[3] == "pulls" and parts[5] == "reviews" and parts[4].isdigit():
+            indices, render = repo.list_indices("reviews", params, int(parts[4]))
+            if indices is None:
+                return "reviews", None, {}
+            return self._page("reviews", indices, render, params, parts, base_url)
+        return "unknown", None, {}
+
+    def _page(self, kind, indices, render, params, parts, base_url):
+        per_page = min(int(params.get("per_page", DEFAULT_PER_PAGE)), MAX_PER_PAGE)
+        page = max(int(params.get("page", 1)), 1)
+        last = max((len(indices) + per_page - 1) // per_page, 1)
+        body = [render(i) for i in indices[(page - 1) * per_page:page * per_page]]
+
+        links = []
+        path = f"{base_url}/{'/'.join(parts)}"
+        if page < last:
+            links.append(f'<{path}?{urlencode({**params, "page": page + 1})}>; rel="next"')
+            links.append(f'<{path}?{urlencode({**params, "page": last})}>; rel="last"')
+        if page > 1:
+            links.append(f'<{path}?{urlencode({**params, "page": 1})}>; rel="first"')
+            links.append(f'<{path}?{urlencode({**params, "page": page - 1})}>; rel="prev"')
+        return kind, body, {"Link": ", ".join(links)} if links else {}
+
+    def graphql(self, payload):
+        variables = payload.get("variables") or {}
+        repo = self.repos.get(f"{variables.get('owner')}/{variables.get('name')}")
+        if repo is None or "pullRequests" not in payload.get("query", ""):
+            return {"data": None, "errors": [{"message": "Could not resolve to a Repository or query not supported."}]}
+        connection = repo.graphql_pull_requests(variables.get("cursor"), min(variables.get("pageSize", 50), 100))
+        return {"data": {"repository": {"pullRequests": connection}}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000, help="total records of the synthetic repository")
+    parser.add_argument("--owner", default="octo")
+    parser.add_argument("--name", default="bench")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--rate-limit", type=int, default=5000, help="requests per token and hour")
+    args = parser.parse_args()
+
+    repo = SyntheticRepo.from_total(args.records, owner=args.owner, name=args.name)
+    stub = GitHubStub([repo], args.host, args.port, rate_limit=args.rate_limit)
+    print(f"Serving {repo.full_name} ({repo.record_counts()}) at {stub.base_url}, GraphQL at {stub.graphql_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,66 @@
 #data_storage.py
 
 import os
+import json
+from itertools import groupby
+from operator import itemgetter
 import pandas as pd
+from data_collection.storage_backends import get_backend, to_typed_frame
+from data_collection.sql_store import SQLiteStore
+from data_collection.record_batch import RecordBatch
+from metrics.rollups import RollupStore, RollupAccumulator, ROLLUP_DEFINITIONS
+
+# Key each entity's records are merged on during incremental syncs
+ENTITY_KEYS = {
+    "commits": "sha",
+    "issues": "id",
+    "forks": "username",
+    "pull_requests": "id",
+    "reviews": "id",
+}
+
+# Field whose maximum is stored as the entity's high-water mark
+WATERMARK_FIELDS = {
+    "commits": "date",
+    "issues": "updated_at",
+    "forks": "date",
+    "pull_requests": "updated_at",
+}
+
+# Per-repository files besides the entity datasets, named <repo key><suffix>
+REPO_FILE_SUFFIXES = ("_watermarks.json", "_rollups.csv", "_sketches.json")
+
+
+def repo_key(full_name):
+    """
+    Filesystem-safe key of a repository ("owner/repo" -> "owner__repo") that every
+    per-repository file, SQLite row and index is stored under. Owners cannot contain
+    underscores, so the key is unambiguous.
+    """
+    return full_name.replace("/", "__")
+
 
 class DataStorage:
-    def __init__(self, storage_dir="data"):
+    def __init__(self, storage_dir="data", backend="csv"):
+        """
+        backend is "csv", "parquet" or "feather" (see storage_backends.py), or "sqlite" to
+        sync every repository into one indexed database (see sql_store.py). With "sqlite",
+        the plain save_data / load_frame helpers keep writing CSV files.
+        """
         self.storage_dir = storage_dir
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
+        self.store = None
+        if backend == "sqlite":
+            self.store = SQLiteStore(os.path.join(self.storage_dir, "github.db"))
+            backend = "csv"
+        self.backend = get_backend(backend)
+        self.rollups = RollupStore(self.storage_dir)
 
     def save_data_to_csv(self, data, filename):
         """Save data to a CSV file."""
         file_path = os.path.join(self.storage_dir, filename)
-        
+
         # Convert data to DataFrame and save as CSV
         if isinstance(data, list):
             df = pd.DataFrame(data)
@@ -26,10 +74,311 @@ class DataStorage:
     def load_data_from_csv(self, filename):
         """Load data from a CSV file."""
         file_path = os.path.join(self.storage_dir, filename)
-        
+
         if os.path.exists(file_path):
             df = pd.read_csv(file_path)
             return df.to_dict(orient="records")
         else:
             raise FileNotFoundError(f"{filename} does not exist")
 
+    def _path(self, name):
+        return os.path.join(self.storage_dir, f"{name}{self.backend.extension}")
+
+    def _to_frame(self, data):
+        if isinstance(data, pd.DataFrame):
+            return data
+        if isinstance(data, RecordBatch):
+            return data.to_pandas()
+        if isinstance(data, list):
+            return pd.DataFrame(data)
+        return pd.DataFrame([data])  # Convert single dictionary to DataFrame
+
+    def save_data(self, data, name):
+        """Save records (or a DataFrame) under a dataset name such as "octocat__Weather-App_commits"."""
+        file_path = self._path(name)
+        self.backend.write(self._to_frame(data), file_path)
+        print(f"Data saved to {file_path}")
+        return file_path
+
+    def load_frame(self, name, columns=None):
+        """
+        Load a dataset as a DataFrame with typed timestamp and categorical columns,
+        reading only `columns` when given. Columnar backends store the types, so
+        nothing is re-parsed here.
+        """
+        file_path = self._path(name)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"{name}{self.backend.extension} does not exist")
+        return to_typed_frame(self.backend.read(file_path, columns))
+
+    def load_data(self, name, columns=None):
+        """Load a dataset as a list of records, as stored."""
+        file_path = self._path(name)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"{name}{self.backend.extension} does not exist")
+        return self.backend.read(file_path, columns).to_dict(orient="records")
+
+    def merge_data(self, data, name, key):
+        """Merge new records into a stored dataset by key, newer records winning."""
+        merged_df, _ = self._merge(data, name, key)
+        return merged_df
+
+    def _merge(self, data, name, key):
+        """merge_data that also returns the stored rows the new records replaced."""
+        file_path = self._path(name)
+        new_df = self._to_frame(data)
+
+        existing_df = self.backend.read(file_path) if os.path.exists(file_path) else None
+        if existing_df is not None and key in existing_df.columns:
+            if self.backend.extension != ".csv":
+                new_df = to_typed_frame(new_df)
+            replaced_df = existing_df[existing_df[key].isin(new_df[key])] if key in new_df.columns else existing_df.iloc[:0]
+            merged_df = pd.concat([existing_df, new_df], ignore_index=True)
+            merged_df = merged_df.drop_duplicates(subset=key, keep='last')
+        else:
+            merged_df, replaced_df = new_df, None
+
+        self.backend.write(merged_df, file_path)
+        print(f"Merged {len(new_df)} records into {file_path}")
+        return merged_df, replaced_df
+
+    def migrate_short_name(self, full_name):
+        """
+        Move a repository's data stored under its bare name (e.g. "api", the layout before
+        keys included the owner) to repo_key(full_name), and return that key. Only data
+        whose stored repository is full_name moves, so "orgB/api" never adopts the files
+        of "orgA/api"; anything else is left in place and gets fetched again.
+        """
+        key = repo_key(full_name)
+        short_name = full_name.split("/")[-1]
+        if self.store is not None:
+            moved = self.store.rename_repo(short_name, key, full_name)
+        else:
+            moved = self._move_datasets(short_name, key, full_name)
+        if moved:
+            for suffix in REPO_FILE_SUFFIXES:
+                old_path = os.path.join(self.storage_dir, f"{short_name}{suffix}")
+                new_path = os.path.join(self.storage_dir, f"{key}{suffix}")
+                if os.path.exists(old_path) and not os.path.exists(new_path):
+                    os.replace(old_path, new_path)
+            print(f"Moved stored data of {full_name} from {short_name} to {key}")
+        return key
+
+    def _move_datasets(self, short_name, key, full_name):
+        if os.path.exists(self._path(f"{key}_repo")) or not os.path.exists(self._path(f"{short_name}_repo")):
+            return False
+        try:
+            stored = self.load_data(f"{short_name}_repo", columns=["full_name"])[0]["full_name"]
+        except Exception as e:
+            print(f"Error reading stored repository {short_name}: {e}")
+            return False
+        if stored != full_name:
+            return False
+        for entity in ("repo",) + tuple(ENTITY_KEYS):
+            if os.path.exists(self._path(f"{short_name}_{entity}")):
+                os.replace(self._path(f"{short_name}_{entity}"), self._path(f"{key}_{entity}"))
+        return True
+
+    def load_watermarks(self, repo_name):
+        """Load the per-entity high-water marks of the last sync, or an empty dict."""
+        file_path = os.path.join(self.storage_dir, f"{repo_name}_watermarks.json")
+        if not os.path.exists(file_path):
+            return {}
+        with open(file_path) as f:
+            return json.load(f)
+
+    def save_watermarks(self, repo_name, watermarks):
+        """Persist the per-entity high-water marks."""
+        file_path = os.path.join(self.storage_dir, f"{repo_name}_watermarks.json")
+        with open(file_path, "w") as f:
+            json.dump(watermarks, f, indent=2)
+        return file_path
+
+    def sync_repo_data(self, repo_name, collected, watermarks=None, as_frames=False):
+        """
+        Store the output of GitHubDataCollector.collect_all for a repository.
+        Entities that had a watermark were fetched incrementally, so their deltas are
+        merged into the stored dataset by key; the rest replace it. Returns the full,
+        merged data per entity (typed DataFrames when as_frames is set, otherwise
+        records) and updates the stored watermarks.
+        """
+        previous = watermarks or {}
+        if self.store is not None:
+            return self._sync_to_store(repo_name, collected, previous, as_frames)
+
+        watermarks = dict(previous)
+        synced = {"repo": collected["repo"]}
+        self.save_data(collected["repo"], f"{repo_name}_repo")
+
+        for entity in ENTITY_KEYS:
+            incremental = self._is_incremental(entity, previous)
+            df = self._sync_entity(repo_name, entity, collected[entity], incremental)
+            watermark = self._watermark(entity, df)
+            if watermark:
+                watermarks[entity] = watermark
+
+            if as_frames:
+                synced[entity] = to_typed_frame(df)
+            elif incremental or isinstance(collected[entity], RecordBatch):
+                synced[entity] = df.to_dict(orient="records")
+            else:
+                synced[entity] = collected[entity]
+
+        self.save_watermarks(repo_name, watermarks)
+        return synced
+
+    def _is_incremental(self, entity, previous):
+        # Reviews follow the pull requests they belong to
+        return previous.get("pull_requests" if entity == "reviews" else entity) is not None
+
+    def _sync_entity(self, repo_name, entity, data, incremental):
+        """Merge (incremental) or replace one entity's dataset, update its rollups and return the stored frame."""
+        name = f"{repo_name}_{entity}"
+        if incremental:
+            df, replaced_df = self._merge(data, name, ENTITY_KEYS[entity])
+        else:
+            df, replaced_df = self._to_frame(data), None
+            self.save_data(df, name)
+        if entity in ROLLUP_DEFINITIONS:
+            self.rollups.update(repo_name, entity, data, replaced_df, rebuild=not incremental)
+        return df
+
+    def _watermark(self, entity, df):
+        field = WATERMARK_FIELDS.get(entity)
+        if field and field in df.columns and not df.empty:
+            return pd.to_datetime(df[field], utc=True, format='ISO8601').max().isoformat()
+        return None
+
+    def _sync_to_store(self, repo_name, collected, previous, as_frames):
+        """sync_repo_data for the sqlite backend: upserts replace the file merges."""
+        watermarks = dict(previous)
+        synced = {"repo": collected["repo"]}
+        self.store.upsert(repo_name, "repos", collected["repo"])
+
+        for entity in ENTITY_KEYS:
+            incremental = self._is_incremental(entity, previous)
+            self._sync_entity_to_store(repo_name, entity, collected[entity], incremental)
+            latest = self._store_watermark(repo_name, entity)
+            if latest:
+                watermarks[entity] = latest
+
+            # Without the store's repo column, like load_repo, so both paths give one schema
+            df = self.store.query(entity, repo=repo_name).drop(columns="repo")
+            synced[entity] = df if as_frames else df.to_dict(orient="records")
+
+        self.save_watermarks(repo_name, watermarks)
+        return synced
+
+    def _sync_entity_to_store(self, repo_name, entity, data, incremental):
+        if entity in ROLLUP_DEFINITIONS:
+            replaced_df = self.store.get_by_keys(repo_name, entity, data) if incremental else None
+            self.rollups.update(repo_name, entity, data, replaced_df, rebuild=not incremental)
+        self.store.upsert(repo_name, entity, data, replace=not incremental)
+
+    def _store_watermark(self, repo_name, entity):
+        field = WATERMARK_FIELDS.get(entity)
+        return self.store.latest(repo_name, entity, field) if field else None
+
+    def stream_repo_data(self, repo_name, pages, watermarks=None):
+        """
+        Streaming counterpart of sync_repo_data, fed by GitHubDataCollector.stream_pages.
+        Fully refreshed entities are written page by page through the backend's chunked
+        writer (CSV appends, Parquet row groups, Feather record batches, SQLite batches)
+        and their rollups accumulated per page, so memory is bounded by the page size
+        instead of the repository's history. Incremental deltas are small and merged
+        like in sync_repo_data. Returns the number of records stored per entity.
+        """
+        previous = watermarks or {}
+        watermarks = dict(previous)
+        stored = {}
+
+        for entity, entity_pages in groupby(pages, key=itemgetter(0)):
+            records = (page for _, page in entity_pages)
+            if entity == "repo":
+                repo_data = next(records)[0]
+                if self.store is not None:
+                    self.store.upsert(repo_name, "repos", repo_data)
+                else:
+                    self.save_data(repo_data, f"{repo_name}_repo")
+                continue
+
+            if self._is_incremental(entity, previous):
+                delta = [record for page in records for record in page]
+                if self.store is not None:
+                    self._sync_entity_to_store(repo_name, entity, delta, True)
+                    watermark = self._store_watermark(repo_name, entity)
+                else:
+                    watermark = self._watermark(entity, self._sync_entity(repo_name, entity, delta, True))
+                stored[entity] = len(delta)
+            else:
+                stored[entity], watermark = self._stream_entity(repo_name, entity, records)
+            if watermark:
+                watermarks[entity] = watermark
+
+        # Fully refreshed entities that returned no pages at all are now empty
+        for entity in ENTITY_KEYS:
+            if entity not in stored and not self._is_incremental(entity, previous):
+                stored[entity], _ = self._stream_entity(repo_name, entity, iter(()))
+
+        self.save_watermarks(repo_name, watermarks)
+        return stored
+
+    def _stream_entity(self, repo_name, entity, pages):
+        """Replace one entity's dataset and rollups from a stream of pages; returns (rows, watermark)."""
+        field = WATERMARK_FIELDS.get(entity)
+        accumulator = RollupAccumulator(entity) if entity in ROLLUP_DEFINITIONS else None
+        if self.store is not None:
+            # One transaction for the whole stream, so a failed fetch keeps the old rows
+            writer = self.store.writer(repo_name, entity)
+        else:
+            file_path = self._path(f"{repo_name}_{entity}")
+            # Written aside and swapped in when complete, so a failed fetch keeps the old data
+            writer = self.backend.writer(f"{file_path}.partial")
+
+        rows, latest = 0, None
+        try:
+            for page in pages:
+                # Parsed once per page for the writer, the rollups and the watermark
+                df = RecordBatch.from_records(page).to_pandas()
+                writer.append(df)
+                if accumulator:
+                    accumulator.add(df)
+                if field:
+                    page_latest = df[field].max()
+                    latest = page_latest if latest is None else max(latest, page_latest)
+                rows += len(page)
+        except BaseException:
+            if self.store is not None:
+                writer.abort()
+            raise
+
+        writer.close()
+        if self.store is None:
+            os.replace(f"{file_path}.partial", file_path)
+            print(f"Streamed {rows} records to {file_path}")
+        if accumulator:
+            self.rollups.replace(repo_name, accumulator)
+        return rows, latest.isoformat() if latest is not None else None
+
+    def load_repo(self, repo_name, entities=ENTITY_KEYS):
+        """Stored data of one repository shaped like sync_repo_data(..., as_frames=True)."""
+        if self.store is not None:
+            repo_data = self.store.query("repos", repo=repo_name).drop(columns="repo")
+            loaded = {"repo": repo_data.to_dict(orient="records")[0]}
+            for entity in entities:
+                loaded[entity] = self.store.query(entity, repo=repo_name).drop(columns="repo")
+            return loaded
+
+        loaded = {"repo": self.load_data(f"{repo_name}_repo")[0]}
+        for entity in entities:
+            try:
+                loaded[entity] = self.load_frame(f"{repo_name}_{entity}")
+            except FileNotFoundError:
+                loaded[entity] = pd.DataFrame()
+        return loaded
+
+    def query(self, entity, repo=None, since=None, until=None, author=None, columns=None):
+        """Filtered load across repositories from the sqlite backend (see SQLiteStore.query)."""
+        if self.store is None:
+            raise ValueError("Filtered queries need DataStorage(backend='sqlite')")
+        return self.store.query(entity, repo=repo, since=since, until=until, author=author, columns=columns)
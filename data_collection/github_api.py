@@ -1,11 +1,103 @@
-from github import Github
-from datetime import datetime
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from types import SimpleNamespace
+import threading
+from collections import Counter
 import pytz
 import pandas as pd
+from data_collection.http_cache import HTTPCache, CachedHTTPClient, GITHUB_API_URL
+from data_collection.scheduler import get_scheduler, INTERACTIVE
+from data_collection.git_mirror import GitMirror
+from data_collection.record_batch import RecordBatch
+
+# Paginated endpoints fetched by collect_all, in the order they are reported
+COLLECTED_ENTITIES = ("commits", "issues", "forks", "pull_requests", "reviews")
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# List endpoint of each entity, as CachedHTTPClient.endpoint() names it
+ENTITY_ENDPOINTS = {
+    "commits": "repos/{repo}/commits",
+    "issues": "repos/{repo}/issues",
+    "forks": "repos/{repo}/forks",
+    "pull_requests": "repos/{repo}/pulls",
+    "reviews": "repos/{repo}/pulls/{n}/reviews",
+}
+
+# Requests that are not list pages, each made at most once per repository
+SINGLE_REQUEST_ENDPOINTS = ("repos/{repo}", "users/{login}")
+
+# Incremental fetches re-read this much history before each watermark. Records are
+# merged by key afterwards, so the overlap only guards against clock skew and late pushes.
+SYNC_OVERLAP = timedelta(hours=1)
+
+# One page of pull requests with their reviews inlined, so the request count grows
+# with the number of PR pages rather than the number of PRs.
+PULL_REQUESTS_QUERY = """
+query($owner: String!, $name: String!, $cursor: String, $pageSize: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $pageSize, after: $cursor, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        databaseId
+        number
+        title
+        createdAt
+        updatedAt
+        mergedAt
+        author { login }
+        reviews(first: 100) {
+          pageInfo { hasNextPage }
+          nodes { databaseId author { login } submittedAt body }
+        }
+      }
+    }
+  }
+}
+"""
+
 
 class GitHubDataCollector:
-    def __init__(self, token):
-        self.github = Github(token)
+    def __init__(self, token, max_workers=5, review_workers=8, review_mode="rest",
+                 cache_dir=".http_cache", cache_max_bytes=256 * 1024 * 1024, base_url=GITHUB_API_URL,
+                 priority=INTERACTIVE, graphql_url=GRAPHQL_URL, assert_requests=False,
+                 commit_source="api", mirror_dir=".git_mirrors", commit_numstat=False):
+        """
+        token is one token or a list of them. Every request goes through the process-wide
+        RequestScheduler of that token pool, which rotates tokens by remaining budget and
+        backs off on rate limits; priority is INTERACTIVE for the dashboard and BATCH for
+        background jobs, which yield to it.
+
+        review_mode is "rest" (one reviews request per PR, fanned out over review_workers
+        threads) or "graphql" (PRs and their reviews fetched together in bulk pages).
+
+        REST list endpoints go through a persistent HTTP cache in cache_dir (None disables
+        it), so unchanged pages are revalidated with ETags instead of counting against the
+        rate limit.
+
+        commit_source is "api" (the REST commits listing) or "git" (a bare mirror of the
+        repository in mirror_dir, cloned once and fetched incrementally, see GitMirror);
+        commit_numstat adds per-commit additions, deletions and files_changed with "git".
+
+        Everything is fetched as raw JSON and projected to the fields the metrics use, so
+        no record triggers follow-up requests. With assert_requests, collect_all and
+        stream_pages check that (see check_request_counts).
+        """
+        tokens = [token] if isinstance(token, str) or token is None else list(token)
+        self.token = tokens[0]
+        self.graphql_url = graphql_url
+        self.scheduler = get_scheduler(tokens)
+        self.max_workers = max_workers
+        self.review_workers = review_workers
+        self.review_mode = review_mode
+        self.http_cache = HTTPCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.http = CachedHTTPClient(cache=self.http_cache, base_url=base_url, scheduler=self.scheduler, priority=priority)
+        self._counts_lock = threading.Lock()
+        self.assert_requests = assert_requests
+        self.commit_source = commit_source
+        self.commit_numstat = commit_numstat
+        self.git_mirror = GitMirror(mirror_dir, token=self.token) if commit_source == "git" else None
+        self.page_counts = Counter()  # endpoint -> list pages received
 
     def _extract_repo_name(self, repo_url):
         # Extract repo name from URL (assuming format https://github.com/owner/repo)
@@ -18,132 +110,460 @@ class GitHubDataCollector:
             return dt.astimezone(pytz.utc)
         return dt
 
+    def _parse_github_time(self, value):
+        """Parse a GitHub ISO-8601 timestamp (e.g. 2024-01-01T00:00:00Z) into a UTC datetime."""
+        return self._convert_to_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+    def _iso(self, value, missing=None):
+        """Normalize a GitHub timestamp to the isoformat() strings stored in records."""
+        return self._parse_github_time(value).isoformat() if value else missing
+
+    def _get_repo(self, repo_url):
+        repo, _ = self.http.get(f"repos/{self._extract_repo_name(repo_url)}")
+        return repo
+
+    def _count(self, counts, entity, n=1):
+        """Increment the shared record counter used for progress reporting."""
+        if counts is not None:
+            with self._counts_lock:
+                counts[entity] += n
+
+    def _paginate(self, path, params=None):
+        """http.paginate, counting the pages received per endpoint for check_request_counts."""
+        for page in self.http.paginate(path, params):
+            with self._counts_lock:
+                self.page_counts[self.http.endpoint(path)] += 1
+            yield page
+
+    def _reset_request_counts(self):
+        with self._counts_lock:
+            self.page_counts.clear()
+        with self.http._counts_lock:
+            self.http.request_counts.clear()
+
+    def check_request_counts(self):
+        """
+        Raise AssertionError unless every entity cost exactly one request per page, and
+        nothing else was requested beyond the repository and owner lookups and GraphQL
+        pages: a per-record lookup (a lazily completed object) shows up as a mismatch.
+        """
+        with self.http._counts_lock:
+            requests_made = dict(self.http.request_counts)
+        with self._counts_lock:
+            pages = dict(self.page_counts)
+        problems = []
+        for endpoint, count in requests_made.items():
+            if endpoint in ENTITY_ENDPOINTS.values() or endpoint == "orgs/{org}/repos":
+                if count != pages.get(endpoint, 0):
+                    problems.append(f"{endpoint}: {count} requests for {pages.get(endpoint, 0)} pages")
+            elif endpoint in SINGLE_REQUEST_ENDPOINTS:
+                if count > 1:
+                    problems.append(f"{endpoint}: {count} requests, expected one")
+            elif endpoint != "graphql":
+                problems.append(f"{endpoint}: {count} unexpected requests")
+        if problems:
+            raise AssertionError("Requests beyond one per page: " + "; ".join(problems))
+        return requests_made
+
+    def _since_datetime(self, watermark):
+        """Turn a stored watermark (ISO string or datetime) into the datetime incremental fetches start from."""
+        if watermark is None:
+            return None
+        if isinstance(watermark, str):
+            watermark = self._parse_github_time(watermark)
+        return self._convert_to_utc(watermark) - SYNC_OVERLAP
+
+    def get_org_repo_urls(self, org):
+        """HTML URLs of every non-archived repository in an organization."""
+        repo_urls = []
+        for page in self._paginate(f"orgs/{org}/repos", {"type": "all", "per_page": 100}):
+            repo_urls.extend(repo["html_url"] for repo in page if not repo.get("archived"))
+        return repo_urls
+
     def get_forks_data(self, repo_url):
-        repo_name = self._extract_repo_name(repo_url)
-        repo = self.github.get_repo(repo_name)
-        forks = repo.get_forks()
-
-        forks_data = []
-        for fork in forks:
-            forks_data.append({
-                "username": fork.owner.login,
-                "date": fork.created_at,
-                "profile_image": fork.owner.avatar_url if fork.owner.avatar_url else None
-            })
-        return forks_data
+        return self._fetch_forks(self._get_repo(repo_url))
+
+    def _fetch_forks(self, repo, counts=None, since=None):
+        return [fork for page in self._iter_forks(repo, counts, since) for fork in page]
+
+    def _iter_forks(self, repo, counts=None, since=None):
+        # Forks are listed newest first, so an incremental fetch stops at the first old fork
+        for page in self._paginate(f"repos/{repo['full_name']}/forks", {"sort": "newest", "per_page": 100}):
+            forks_data = []
+            reached_watermark = False
+            for fork in page:
+                if since is not None and self._parse_github_time(fork["created_at"]) < since:
+                    reached_watermark = True
+                    break
+                forks_data.append({
+                    "username": fork["owner"]["login"],
+                    "date": self._iso(fork["created_at"]),
+                    "profile_image": fork["owner"]["avatar_url"] if fork["owner"]["avatar_url"] else None
+                })
+            self._count(counts, "forks", len(forks_data))
+            if forks_data:
+                yield forks_data
+            if reached_watermark:
+                return
 
     def get_repo_data(self, repo_url):
-        repo_name = self._extract_repo_name(repo_url)
-        repo = self.github.get_repo(repo_name)
-        
+        return self._build_repo_data(self._get_repo(repo_url))
+
+    def _build_repo_data(self, repo):
         return {
-            "name": repo.name,
-            "full_name": repo.full_name,
-            "description": repo.description,
-            "language": repo.language,
-            "created_at": self._convert_to_utc(repo.created_at).isoformat(),
-            "updated_at": self._convert_to_utc(repo.updated_at).isoformat(),
-            "stargazers_count": repo.stargazers_count,
-            "forks_count": repo.forks_count,
-            "open_issues_count": repo.open_issues_count
+            "name": repo["name"],
+            "full_name": repo["full_name"],
+            "description": repo["description"],
+            "language": repo["language"],
+            "created_at": self._iso(repo["created_at"]),
+            "updated_at": self._iso(repo["updated_at"]),
+            "stargazers_count": repo["stargazers_count"],
+            "forks_count": repo["forks_count"],
+            "open_issues_count": repo["open_issues_count"]
         }
 
+    def get_owner_data(self, repo):
+        """Fetch the repository owner's profile; attributes mirror the PyGithub NamedUser fields used by the dashboard."""
+        owner, _ = self.http.get(f"users/{repo['owner']['login']}")
+        return SimpleNamespace(**owner)
+
     def get_commits_data(self, repo_url):
-        repo_name = self._extract_repo_name(repo_url)
-        repo = self.github.get_repo(repo_name)
-        commits = repo.get_commits()
-        
-        commits_data = []
-        for commit in commits:
-            commits_data.append({
-                "sha": commit.sha,
-                "author": commit.commit.author.name,
-                "date": self._convert_to_utc(commit.commit.author.date).isoformat(),
-                "message": commit.commit.message
-            })
-        return commits_data
+        return self._fetch_commits(self._get_repo(repo_url))
+
+    def _fetch_commits(self, repo, counts=None, since=None):
+        return [commit for page in self._iter_commits(repo, counts, since) for commit in page]
+
+    def _iter_commits(self, repo, counts=None, since=None):
+        if self.commit_source == "git":
+            yield from self._iter_git_commits(repo, counts, since)
+            return
+        params = {"per_page": 100}
+        if since is not None:
+            params["since"] = since.isoformat()
+        for page in self._paginate(f"repos/{repo['full_name']}/commits", params):
+            self._count(counts, "commits", len(page))
+            yield [{
+                "sha": commit["sha"],
+                "author": commit["commit"]["author"]["name"],
+                "date": self._iso(commit["commit"]["author"]["date"]),
+                "message": commit["commit"]["message"],
+                # The GitHub account behind the author, when the commit email is linked to one
+                "login": commit["author"]["login"] if commit.get("author") else None
+            } for commit in page]
+
+    def _iter_git_commits(self, repo, counts=None, since=None):
+        """Commit pages read from the repository's local mirror, which is brought up to date first."""
+        self.git_mirror.sync(repo["clone_url"], repo["full_name"])
+        for page in self.git_mirror.iter_commits(repo["full_name"], since=since, numstat=self.commit_numstat):
+            self._count(counts, "commits", len(page))
+            yield page
 
     def get_issues_data(self, repo_url):
-        repo_name = self._extract_repo_name(repo_url)
-        repo = self.github.get_repo(repo_name)
-        issues = repo.get_issues(state='all')
-        
-        issues_data = []
-        for issue in issues:
-            issues_data.append({
-                "id": issue.id,
-                "title": issue.title,
-                "state": issue.state,
-                "created_at": self._convert_to_utc(issue.created_at).isoformat(),
-                "closed_at": self._convert_to_utc(issue.closed_at).isoformat() if issue.closed_at else "Not Closed"
-            })
-        return issues_data
+        return self._fetch_issues(self._get_repo(repo_url))
+
+    def _fetch_issues(self, repo, counts=None, since=None):
+        return [issue for page in self._iter_issues(repo, counts, since) for issue in page]
+
+    def _iter_issues(self, repo, counts=None, since=None):
+        params = {"state": "all", "per_page": 100}
+        if since is not None:
+            params.update({"sort": "updated", "direction": "asc", "since": since.isoformat()})
+        for page in self._paginate(f"repos/{repo['full_name']}/issues", params):
+            # The issues endpoint lists pull requests too; those come from the pulls endpoint
+            issues_data = [{
+                "id": issue["id"],
+                "title": issue["title"],
+                "state": issue["state"],
+                "created_at": self._iso(issue["created_at"]),
+                "updated_at": self._iso(issue["updated_at"]),
+                "closed_at": self._iso(issue["closed_at"], "Not Closed")
+            } for issue in page if "pull_request" not in issue]
+            self._count(counts, "issues", len(issues_data))
+            if issues_data:
+                yield issues_data
 
     def get_pull_requests_data(self, repo_url):
-        repo_name = self._extract_repo_name(repo_url)
-        repo = self.github.get_repo(repo_name)
-    
+        return self._fetch_pull_requests(self._get_repo(repo_url))
+
+    def _fetch_pull_requests(self, repo, counts=None, since=None):
+        return [pr for page in self._iter_pull_requests(repo, counts, since) for pr in page]
+
+    def _iter_pull_requests(self, repo, counts=None, since=None):
+        # The pulls endpoint has no `since` filter, so walk it by most recent update and stop early
+        params = {"state": "all", "sort": "updated", "direction": "desc", "per_page": 100}
+        for page in self._paginate(f"repos/{repo['full_name']}/pulls", params):
+            pull_requests_data = []
+            reached_watermark = False
+            for pr in page:
+                if since is not None and self._parse_github_time(pr["updated_at"]) < since:
+                    reached_watermark = True
+                    break
+                pull_requests_data.append({
+                    "id": pr["id"],
+                    "number": pr["number"],
+                    "title": pr["title"],
+                    "created_at": self._iso(pr["created_at"]),
+                    "updated_at": self._iso(pr["updated_at"]),
+                    "merged_at": self._iso(pr["merged_at"], "Not Merged"),
+                    "user": pr["user"]["login"]
+                })
+            self._count(counts, "pull_requests", len(pull_requests_data))
+            if pull_requests_data:
+                yield pull_requests_data
+            if reached_watermark:
+                return
+
+    def get_code_reviews_data(self, repo_url, pull_requests_data=None):
+        """Fetch reviews for every PR, reusing already fetched PR records when given."""
+        repo = self._get_repo(repo_url)
+        if pull_requests_data is None:
+            pull_requests_data = self._fetch_pull_requests(repo)
+        return self._fetch_reviews(repo, pull_requests_data)
+
+    def _fetch_reviews(self, repo, pull_requests_data, counts=None):
+        return [review for pr_reviews in self._iter_reviews(repo, pull_requests_data, counts) for review in pr_reviews]
+
+    def _iter_reviews(self, repo, pull_requests_data, counts=None):
+        """
+        Fan the per-PR review requests out over at most `review_workers` threads and yield
+        each PR's reviews in PR order. PRs are submitted a window at a time, so results
+        never pile up ahead of a slow consumer.
+        """
+        def fetch_pr_reviews(pr):
+            pr_reviews = []
+            for page in self._paginate(f"repos/{repo['full_name']}/pulls/{pr['number']}/reviews", {"per_page": 100}):
+                for review in page:
+                    if not review.get("submitted_at"):
+                        continue  # pending reviews have no submission time yet
+                    pr_reviews.append({
+                        "id": review["id"],
+                        "pr_id": pr["id"],
+                        "reviewer": review["user"]["login"] if review["user"] else "ghost",
+                        "submitted_at": self._iso(review["submitted_at"]),
+                        "body": review["body"]
+                    })
+                self._count(counts, "reviews", len(page))
+            return pr_reviews
+
+        window = self.review_workers * 4
+        with ThreadPoolExecutor(max_workers=self.review_workers) as executor:
+            for start in range(0, len(pull_requests_data), window):
+                # map keeps the PR order, so the output matches the sequential version
+                for pr_reviews in executor.map(fetch_pr_reviews, pull_requests_data[start:start + window]):
+                    if pr_reviews:
+                        yield pr_reviews
+
+    def _iter_review_pages(self, repo, pull_requests_data, counts=None, page_size=100):
+        """_iter_reviews regrouped into pages of about page_size reviews, so consumers get chunky pages."""
+        reviews_page = []
+        for pr_reviews in self._iter_reviews(repo, pull_requests_data, counts):
+            reviews_page.extend(pr_reviews)
+            if len(reviews_page) >= page_size:
+                yield reviews_page
+                reviews_page = []
+        if reviews_page:
+            yield reviews_page
+
+    def _graphql(self, query, variables):
+        payload = self.http.post(self.graphql_url, {"query": query, "variables": variables})
+        if payload.get("errors"):
+            raise RuntimeError(f"GraphQL error: {payload['errors'][0].get('message')}")
+        return payload["data"]
+
+    def _fetch_pull_requests_graphql(self, repo, counts=None, since=None, page_size=50):
+        """Fetch PR and review records together in bulk GraphQL pages, most recently updated first."""
+        owner, name = repo["full_name"].split('/')
         pull_requests_data = []
-        for pr in repo.get_pulls(state='all'):
-            pull_requests_data.append({
-                "id": pr.id,
-                "title": pr.title,
-                "created_at": pr.created_at.isoformat(),
-                "merged_at": pr.merged_at.isoformat() if pr.merged_at else "Not Merged",
-                "user": pr.user.login
+        reviews_data = []
+        truncated = []  # PRs with more than 100 reviews
+        cursor = None
+
+        while True:
+            data = self._graphql(PULL_REQUESTS_QUERY, {
+                "owner": owner, "name": name, "cursor": cursor, "pageSize": page_size
             })
-        return pull_requests_data
+            pull_requests = data["repository"]["pullRequests"]
+            reached_watermark = False
+            for pr in pull_requests["nodes"]:
+                if since is not None and self._parse_github_time(pr["updatedAt"]) < since:
+                    reached_watermark = True
+                    break
+                record = {
+                    "id": pr["databaseId"],
+                    "number": pr["number"],
+                    "title": pr["title"],
+                    "created_at": self._iso(pr["createdAt"]),
+                    "updated_at": self._iso(pr["updatedAt"]),
+                    "merged_at": self._iso(pr["mergedAt"], "Not Merged"),
+                    "user": pr["author"]["login"] if pr["author"] else "ghost"
+                }
+                pull_requests_data.append(record)
+                self._count(counts, "pull_requests")
 
-    def get_code_reviews_data(self, repo_url):
-        repo_name = self._extract_repo_name(repo_url)
-        repo = self.github.get_repo(repo_name)
-        pull_requests = repo.get_pulls(state='all')
-        
-        reviews_data = []
-        for pr in pull_requests:
-            reviews = pr.get_reviews()
-            for review in reviews:
-                reviews_data.append({
-                    "pr_id": pr.id,
-                    "reviewer": review.user.login,
-                    "submitted_at": self._convert_to_utc(review.submitted_at).isoformat(),
-                    "body": review.body
-                })
-        return reviews_data
+                if pr["reviews"]["pageInfo"]["hasNextPage"]:
+                    truncated.append(record)
+                    continue
+                for review in pr["reviews"]["nodes"]:
+                    if not review["submittedAt"]:
+                        continue  # pending reviews are not returned by the REST endpoint either
+                    reviews_data.append({
+                        "id": review["databaseId"],
+                        "pr_id": pr["databaseId"],
+                        "reviewer": review["author"]["login"] if review["author"] else "ghost",
+                        "submitted_at": self._iso(review["submittedAt"]),
+                        "body": review["body"]
+                    })
+                    self._count(counts, "reviews")
+
+            if reached_watermark or not pull_requests["pageInfo"]["hasNextPage"]:
+                break
+            cursor = pull_requests["pageInfo"]["endCursor"]
+
+        # The few PRs with very long review threads fall back to the paginated REST listing
+        if truncated:
+            reviews_data.extend(self._fetch_reviews(repo, truncated, counts))
+
+        return pull_requests_data, reviews_data
+
+    def collect_all(self, repo_url, progress_callback=None, poll_interval=0.5, since=None):
+        """
+        Resolve the repository once and fetch every paginated endpoint concurrently.
+        Returns a dict keyed by "repo", "owner" and the names in COLLECTED_ENTITIES, with
+        each entity's records as a RecordBatch: the pages are parsed into typed columns
+        as they arrive instead of being kept as dicts of strings.
+
+        progress_callback(counts, done, total) is called from the calling thread (so it
+        may safely touch Streamlit elements) with the running record count per entity
+        and the number of endpoints finished so far.
+
+        since maps entity names to watermarks (see DataStorage.load_watermarks). Entities
+        with a watermark are fetched incrementally: only records created or updated after
+        it, and only the reviews of pull requests updated after it.
+        """
+        since = since or {}
+        self._reset_request_counts()
+        repo = self._get_repo(repo_url)
+        def batched(iter_pages):
+            return lambda *args: RecordBatch.from_pages(iter_pages(*args))
+
+        def batched_graphql(*args):
+            pull_requests_data, reviews_data = self._fetch_pull_requests_graphql(*args)
+            return RecordBatch.from_records(pull_requests_data), RecordBatch.from_records(reviews_data)
+
+        fetchers = {
+            "commits": batched(self._iter_commits),
+            "issues": batched(self._iter_issues),
+            "forks": batched(self._iter_forks),
+        }
+        if self.review_mode == "graphql":
+            fetchers["pull_requests"] = batched_graphql
+        else:
+            fetchers["pull_requests"] = batched(self._iter_pull_requests)
+        counts = {entity: 0 for entity in COLLECTED_ENTITIES}
+        results = {"repo": self._build_repo_data(repo)}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(fetch, repo, counts, self._since_datetime(since.get(entity))): entity
+                for entity, fetch in fetchers.items()
+            }
+            futures[executor.submit(self.get_owner_data, repo)] = "owner"
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    # Re-raises the worker's exception in the caller, like the sequential calls did
+                    entity = futures[future]
+                    if entity == "pull_requests" and self.review_mode == "graphql":
+                        results["pull_requests"], results["reviews"] = future.result()
+                    else:
+                        results[entity] = future.result()
+                    if entity == "pull_requests" and self.review_mode != "graphql":
+                        # Reviews reuse the PR records that were just listed
+                        reviewed_pull_requests = results["pull_requests"].records(["id", "number"])
+                        reviews_future = executor.submit(
+                            batched(self._iter_review_pages), repo, reviewed_pull_requests, counts
+                        )
+                        futures[reviews_future] = "reviews"
+                        pending.add(reviews_future)
+                if progress_callback:
+                    with self._counts_lock:
+                        snapshot = dict(counts)
+                    done = sum(entity in results for entity in COLLECTED_ENTITIES)
+                    progress_callback(snapshot, done, len(COLLECTED_ENTITIES))
+
+        if self.assert_requests:
+            self.check_request_counts()
+        return results
+
+    def stream_pages(self, repo_url, since=None, counts=None):
+        """
+        Streaming counterpart of collect_all: yields (entity, records) one page at a time,
+        starting with ("repo", [repo record]) and ending with the reviews, so memory stays
+        bounded by the page size. Only the PRs' id and number are kept to list reviews.
+        Entities are fetched one after another; since works as in collect_all.
+        """
+        since = since or {}
+        self._reset_request_counts()
+        repo = self._get_repo(repo_url)
+        yield "repo", [self._build_repo_data(repo)]
+        pages = {
+            "commits": self._iter_commits,
+            "issues": self._iter_issues,
+            "forks": self._iter_forks,
+            "pull_requests": self._iter_pull_requests,
+        }
+        reviewed_pull_requests = []
+        for entity, iter_pages in pages.items():
+            for page in iter_pages(repo, counts, self._since_datetime(since.get(entity))):
+                if entity == "pull_requests":
+                    reviewed_pull_requests.extend({"id": pr["id"], "number": pr["number"]} for pr in page)
+                yield entity, page
+        for page in self._iter_review_pages(repo, reviewed_pull_requests, counts):
+            yield "reviews", page
+        if self.assert_requests:
+            self.check_request_counts()
 
     # Fetch PR data
     def fetch_pr_data(self, repo_url):
+        """
+        State and timestamps of every PR, from the pulls list alone: merged is derived
+        from merged_at instead of completing each PR with its own request.
+        """
         repo_name = self._extract_repo_name(repo_url)
-        repo = self.github.get_repo(repo_name)
-        pulls = repo.get_pulls(state="all")
-        
         pr_data = []
-        for pr in pulls:
-            pr_data.append({
-                'number': pr.number,
-                'state': pr.state,
-                'merged': pr.merged,
-                'created_at': pr.created_at,
-                'closed_at': pr.closed_at if pr.closed_at else pd.NaT,  # Handle missing closed_at
-                'merged_at': pr.merged_at if pr.merged_at else pd.NaT  # Handle missing merged_at
-            })
-        
-        return pd.DataFrame(pr_data)
+        for page in self._paginate(f"repos/{repo_name}/pulls", {"state": "all", "per_page": 100}):
+            for pr in page:
+                pr_data.append({
+                    'number': pr['number'],
+                    'state': pr['state'],
+                    'merged': pr['merged_at'] is not None,
+                    'created_at': pr['created_at'],
+                    'closed_at': pr['closed_at'],
+                    'merged_at': pr['merged_at']
+                })
+
+        pr_df = pd.DataFrame(pr_data, columns=['number', 'state', 'merged', 'created_at', 'closed_at', 'merged_at'])
+        for column in ('created_at', 'closed_at', 'merged_at'):
+            pr_df[column] = pd.to_datetime(pr_df[column], utc=True)  # Missing times become NaT
+        return pr_df
 
     # Fetch issue data
     def fetch_issue_data(self, repo_url):
+        """Closed issues with their resolution time in hours; PRs listed as issues are skipped as they are read."""
         repo_name = self._extract_repo_name(repo_url)
-        repo = self.github.get_repo(repo_name)
-        issues = repo.get_issues(state="closed")
-        
         issue_data = []
-        for issue in issues:
-            if not issue.pull_request:  # Exclude PRs labeled as issues
-                issue_data.append({
-                    'number': issue.number,
-                    'created_at': issue.created_at,
-                    'closed_at': issue.closed_at,
-                    'resolution_time': (issue.closed_at - issue.created_at).total_seconds() / 3600 if issue.closed_at else pd.NA  # Handle missing closed_at
-                })
-        
-        return pd.DataFrame(issue_data)
+        for page in self._paginate(f"repos/{repo_name}/issues", {"state": "closed", "per_page": 100}):
+            for issue in page:
+                if "pull_request" not in issue:  # Exclude PRs labeled as issues
+                    issue_data.append({
+                        'number': issue['number'],
+                        'created_at': issue['created_at'],
+                        'closed_at': issue['closed_at']
+                    })
+
+        issue_df = pd.DataFrame(issue_data, columns=['number', 'created_at', 'closed_at'])
+        for column in ('created_at', 'closed_at'):
+            issue_df[column] = pd.to_datetime(issue_df[column], utc=True)
+        issue_df['resolution_time'] = (issue_df['closed_at'] - issue_df['created_at']).dt.total_seconds() / 3600
+        return issue_df
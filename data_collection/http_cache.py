@@ -0,0 +1,224 @@
+#http_cache.py
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from urllib.parse import urlencode, urlsplit
+import requests
+from data_collection.scheduler import RequestScheduler, INTERACTIVE
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Response headers kept with a cached body; Link is needed to keep paginating from a 304
+CACHED_HEADERS = ("ETag", "Last-Modified", "Link")
+
+
+class HTTPCache:
+    """
+    Persistent, size-bounded LRU cache of GET responses keyed by URL.
+    Each entry is one JSON file holding the body and its validators (ETag / Last-Modified);
+    file modification times record the LRU order across sessions.
+    """
+
+    def __init__(self, cache_dir=".http_cache", max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        files = [f for f in os.listdir(self.cache_dir) if f.endswith(".json")]
+        files.sort(key=lambda f: os.path.getmtime(os.path.join(self.cache_dir, f)))
+        for filename in files:
+            size = os.path.getsize(os.path.join(self.cache_dir, filename))
+            self._entries[filename[:-len(".json")]] = size
+            self._total_bytes += size
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, url):
+        """Return the cached entry for a URL (body, headers), or None."""
+        key = self._key(url)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            try:
+                with open(self._path(key)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+        return entry
+
+    def validators(self, entry):
+        """Conditional request headers (If-None-Match / If-Modified-Since) for a cached entry."""
+        headers = {}
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def put(self, url, body, headers):
+        """Store a response body with the headers needed to revalidate and paginate it."""
+        key = self._key(url)
+        entry = {
+            "url": url,
+            "headers": {name: headers[name] for name in CACHED_HEADERS if headers.get(name)},
+            "body": body
+        }
+        data = json.dumps(entry)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            with open(self._path(key), "w") as f:
+                f.write(data)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def record_hit(self, url):
+        """Count a revalidated hit and mark the URL as recently used, also on disk for the next session."""
+        key = self._key(url)
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                os.utime(self._path(key))
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _drop(self, key):
+        self._total_bytes -= self._entries.pop(key, 0)
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes
+        }
+
+
+class CachedHTTPClient:
+    """Minimal GitHub REST client that revalidates every GET against an HTTPCache."""
+
+    def __init__(self, token=None, cache=None, base_url=GITHUB_API_URL, timeout=30, scheduler=None, priority=INTERACTIVE):
+        """
+        Requests are sent through a RequestScheduler (a single-token one built from token
+        when none is given), which picks the token, paces and retries rate-limited calls.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.timeout = timeout
+        self.scheduler = scheduler or RequestScheduler([token])
+        self.priority = priority
+        self.session = requests.Session()
+        self.session.mount(self.base_url, requests.adapters.HTTPAdapter(pool_maxsize=32))
+        self.session.headers["Accept"] = "application/vnd.github+json"
+        self.request_counts = Counter()  # endpoint template -> requests (see endpoint())
+        self._counts_lock = threading.Lock()
+
+    def _url(self, path, params=None):
+        url = path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+        if params:
+            # Sorted so equal requests always map to the same cache key
+            url = f"{url}?{urlencode(sorted(params.items()))}"
+        return url
+
+    def endpoint(self, url):
+        """
+        Template of a request URL for request_counts, with the repository, user and
+        numbers abstracted: "repos/{repo}/pulls/{n}/reviews", "users/{login}", "graphql".
+        """
+        path = urlsplit(url).path
+        base_path = urlsplit(self.base_url).path
+        if path.startswith(base_path):
+            path = path[len(base_path):]
+        path = re.sub(r"^repos/[^/]+/[^/]+", "repos/{repo}", path.strip("/"))
+        path = re.sub(r"^users/[^/]+", "users/{login}", path)
+        path = re.sub(r"^orgs/[^/]+", "orgs/{org}", path)
+        return re.sub(r"/\d+(?=/|$)", "/{n}", path)
+
+    def _counted(self, url):
+        with self._counts_lock:
+            self.request_counts[self.endpoint(url)] += 1
+
+    def get(self, path, params=None):
+        """GET a URL and return (json body, headers), serving 304 Not Modified from the cache."""
+        url = self._url(path, params)
+        self._counted(url)
+        entry = self.cache.get(url) if self.cache else None
+        headers = self.cache.validators(entry) if entry else {}
+
+        response = self._send("get", url, "core", headers=headers)
+        if response.status_code == 304 and entry is not None:
+            # Not Modified: GitHub does not count this against the rate limit
+            self.cache.record_hit(url)
+            return entry["body"], entry["headers"]
+
+        response.raise_for_status()
+        body = response.json()
+        if self.cache:
+            self.cache.record_miss()
+            if response.headers.get("ETag") or response.headers.get("Last-Modified"):
+                self.cache.put(url, body, response.headers)
+        return body, response.headers
+
+    def post(self, url, payload, resource="graphql"):
+        """POST a JSON payload (GraphQL queries) through the scheduler and return the json body."""
+        self._counted(url)
+        response = self._send("post", url, resource, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def _send(self, method, url, resource, headers=None, **kwargs):
+        """Send one request with a scheduled token, retrying while it is rate limited."""
+        for attempt in range(self.scheduler.max_retries + 1):
+            with self.scheduler.lease(self.priority, resource) as token:
+                request_headers = dict(headers or {})
+                if token:
+                    request_headers["Authorization"] = f"token {token}"
+                response = self.session.request(method, url, headers=request_headers, timeout=self.timeout, **kwargs)
+            if not self.scheduler.record(token, response, resource) or attempt == self.scheduler.max_retries:
+                return response
+            self.scheduler.back_off(token, response, attempt)
+
+    def paginate(self, path, params=None):
+        """Yield the items of a paginated list endpoint one page at a time."""
+        url = self._url(path, params)
+        while url:
+            page, headers = self.get(url)
+            yield page
+            url = self._next_link(headers)
+
+    def _next_link(self, headers):
+        link_header = headers.get("Link")
+        if not link_header:
+            return None
+        for link in requests.utils.parse_header_links(link_header):
+            if link.get("rel") == "next":
+                return link["url"]
+        return None
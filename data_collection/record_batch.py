@@ -0,0 +1,144 @@
+#record_batch.py
+
+import numpy as np
+import pandas as pd
+from data_collection.storage_backends import TIMESTAMP_COLUMNS, CATEGORICAL_COLUMNS
+
+# numpy's NaT: the int64 value that marks a missing timestamp
+NULL_TIMESTAMP = np.iinfo(np.int64).min
+
+UTC_NS = pd.DatetimeTZDtype("ns", "UTC")
+
+# Appended records are encoded this many at a time, so parsing runs on large vectors
+ENCODE_ROWS = 10_000
+
+
+def _code_dtype(categories):
+    """Smallest integer type pandas keeps categorical codes in, so from_codes does not copy them."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class RecordBatch:
+    """
+    Columnar form of one entity's records, built page by page from the collector's dicts.
+
+    - Timestamp columns (TIMESTAMP_COLUMNS) are parsed once, on append, into int64 epoch
+      nanoseconds; NaT is the null mask, so sentinels like "Not Closed" never get stored.
+    - Author and login columns (CATEGORICAL_COLUMNS) are interned: each value is kept once
+      and rows hold integer codes into that table.
+    - Integer columns are int64 arrays and the remaining text columns object arrays.
+
+    to_pandas() wraps those arrays in a typed DataFrame without copying them, so the
+    metrics find the timestamps already parsed.
+    """
+
+    def __init__(self):
+        self._chunks = {}  # column -> encoded arrays, concatenated when read
+        self._categories = {}  # categorical column -> {value: code}
+        self._length = 0  # encoded rows
+        self._pending = []  # appended records not encoded yet
+        self._pending_columns = {}
+
+    @classmethod
+    def from_records(cls, records):
+        batch = cls()
+        batch.append(records)
+        batch._encode_pending()
+        return batch
+
+    @classmethod
+    def from_pages(cls, pages):
+        batch = cls()
+        for page in pages:
+            batch.append(page)
+        batch._encode_pending()
+        return batch
+
+    def __len__(self):
+        return self._length + len(self._pending)
+
+    @property
+    def columns(self):
+        self._encode_pending()
+        return list(self._chunks)
+
+    def append(self, records):
+        """Add a page of record dicts. Records of one entity share their keys, so a page's first one names its columns."""
+        if isinstance(records, dict):
+            records = [records]
+        if not records:
+            return
+        self._pending.extend(records)
+        self._pending_columns.update(dict.fromkeys(records[0]))
+        if len(self._pending) >= ENCODE_ROWS:
+            self._encode_pending()
+
+    def _encode_pending(self):
+        if not self._pending:
+            return
+        records, self._pending = self._pending, []
+        for column in self._pending_columns:
+            if column not in self._chunks:
+                # A column that only shows up now is null for the rows before
+                self._chunks[column] = [self._nulls(column, self._length)] if self._length else []
+        self._pending_columns = {}
+        for column, chunks in self._chunks.items():
+            chunks.append(self._encode(column, [record.get(column) for record in records]))
+        self._length += len(records)
+
+    def _encode(self, column, values):
+        if column in TIMESTAMP_COLUMNS:
+            parsed = pd.to_datetime(values, errors='coerce', utc=True, format='ISO8601')
+            return parsed.as_unit("ns").asi8
+        if column in CATEGORICAL_COLUMNS:
+            table = self._categories.setdefault(column, {})
+            return np.fromiter(
+                (-1 if value is None else table.setdefault(value, len(table)) for value in values),
+                dtype=np.int32, count=len(values)
+            )
+        if all(type(value) is int for value in values):
+            return np.array(values, dtype=np.int64)
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    def _nulls(self, column, length):
+        if column in TIMESTAMP_COLUMNS:
+            return np.full(length, NULL_TIMESTAMP, dtype=np.int64)
+        if column in CATEGORICAL_COLUMNS:
+            return np.full(length, -1, dtype=np.int32)
+        return np.full(length, None, dtype=object)
+
+    def column(self, column):
+        """The stored array of a column: epoch nanoseconds, category codes or values."""
+        self._encode_pending()
+        chunks = self._chunks[column]
+        array = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        if column in CATEGORICAL_COLUMNS:
+            array = array.astype(_code_dtype(len(self._categories.get(column, {}))), copy=False)
+        self._chunks[column] = [array]
+        return array
+
+    def to_pandas(self, columns=None):
+        """Typed DataFrame (UTC timestamps with NaT, categoricals) sharing this batch's memory."""
+        if not len(self):
+            return pd.DataFrame()
+        data = {}
+        for column in columns or self.columns:
+            values = self.column(column)
+            if column in TIMESTAMP_COLUMNS:
+                # The values already are UTC nanoseconds; tz_localize would copy them
+                data[column] = pd.arrays.DatetimeArray._simple_new(values.view("M8[ns]"), dtype=UTC_NS)
+            elif column in CATEGORICAL_COLUMNS:
+                categories = pd.Index(list(self._categories.get(column, {})), dtype=object)
+                data[column] = pd.Categorical.from_codes(values, categories=categories, validate=False)
+            else:
+                data[column] = pd.Series(values, dtype=values.dtype, copy=False)
+        return pd.DataFrame(data, copy=False)
+
+    def records(self, columns=None):
+        """The rows as dicts (timestamps as pandas Timestamps, NaT when missing)."""
+        return self.to_pandas(columns).to_dict(orient="records")
@@ -0,0 +1,165 @@
+#scheduler.py
+
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+# Request priorities: dashboard fetches run first, batch jobs yield to them and keep a reserve
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Budget assumed for a token GitHub has not reported on yet (the authenticated REST limit)
+DEFAULT_LIMIT = 5000
+
+# Backoffs happen on the collector's worker threads, so they are logged rather than printed
+logger = logging.getLogger(__name__)
+
+
+class RequestScheduler:
+    """
+    Hands out GitHub tokens to requests and keeps every token's rate-limit budget,
+    per API resource ("core", "graphql", ...), from the X-RateLimit-* response headers.
+
+    - Requests go to the token with the most budget left, so a pool of tokens adds up.
+    - Batch requests leave batch_reserve of each token's budget to interactive ones,
+      wait while interactive requests are in flight, and are paced to spread what is
+      left until the reset once less than pace_below of the budget remains.
+    - A 403/429 rate-limit response cools its token down (Retry-After, the reset time or
+      exponential backoff with full jitter) and the retry moves on to another token.
+    """
+
+    def __init__(self, tokens, batch_reserve=0.1, pace_below=0.5, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.tokens = list(tokens) or [None]
+        self.batch_reserve = batch_reserve
+        self.pace_below = pace_below
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._condition = threading.Condition()
+        self._budgets = {}  # (token, resource) -> {"remaining", "limit", "reset"}
+        self._cooldowns = {}  # token -> time before which it must not be used
+        self._next_batch_slot = {}  # resource -> earliest start of the next paced batch request
+        self._interactive_in_flight = 0
+        self._turn = 0
+
+    def _budget(self, token, resource, now):
+        budget = self._budgets.setdefault(
+            (token, resource), {"remaining": DEFAULT_LIMIT, "limit": DEFAULT_LIMIT, "reset": None}
+        )
+        if budget["reset"] is not None and budget["reset"] <= now:
+            budget.update(remaining=budget["limit"], reset=None)
+        return budget
+
+    def _pick(self, priority, resource, now):
+        """(token, 0) for the token to use now, or (None, seconds to wait)."""
+        if priority == BATCH and self._interactive_in_flight:
+            return None, 0.1
+
+        best, best_usable, wait = None, 0, self.max_delay
+        # Rotate the starting point so equal budgets are shared round-robin
+        self._turn = (self._turn + 1) % len(self.tokens)
+        for token in self.tokens[self._turn:] + self.tokens[:self._turn]:
+            budget = self._budget(token, resource, now)
+            cooldown = self._cooldowns.get(token, 0)
+            reserve = int(budget["limit"] * self.batch_reserve) if priority == BATCH else 0
+            usable = budget["remaining"] - reserve
+            if cooldown > now:
+                wait = min(wait, cooldown - now)
+            elif usable <= 0:
+                wait = min(wait, (budget["reset"] - now) if budget["reset"] else self.base_delay)
+            elif usable > best_usable:
+                best, best_usable = token, usable
+        if best is None:
+            return None, max(wait, 0.01)
+
+        budget = self._budget(best, resource, now)
+        if priority == BATCH and budget["reset"] and budget["remaining"] < budget["limit"] * self.pace_below:
+            slot = self._next_batch_slot.get(resource, now)
+            if slot > now:
+                return None, slot - now
+            self._next_batch_slot[resource] = now + (budget["reset"] - now) / best_usable
+        budget["remaining"] -= 1  # Counted now so concurrent requests do not overdraw it
+        return best, 0
+
+    @contextmanager
+    def lease(self, priority=INTERACTIVE, resource="core"):
+        """Block until a token may send one request and yield it."""
+        with self._condition:
+            while True:
+                token, wait = self._pick(priority, resource, time.time())
+                if wait == 0:
+                    break
+                self._condition.wait(wait)
+            if priority == INTERACTIVE:
+                self._interactive_in_flight += 1
+        try:
+            yield token
+        finally:
+            with self._condition:
+                if priority == INTERACTIVE:
+                    self._interactive_in_flight -= 1
+                self._condition.notify_all()
+
+    def record(self, token, response, resource="core"):
+        """Update a token's budget from a response; returns True if it was rate limited."""
+        headers = response.headers
+        now = time.time()
+        with self._condition:
+            if "X-RateLimit-Remaining" in headers:
+                budget = self._budget(token, headers.get("X-RateLimit-Resource", resource), now)
+                budget["remaining"] = int(headers["X-RateLimit-Remaining"])
+                budget["limit"] = int(headers.get("X-RateLimit-Limit", budget["limit"]))
+                if "X-RateLimit-Reset" in headers:
+                    budget["reset"] = int(headers["X-RateLimit-Reset"])
+            self._condition.notify_all()
+        return response.status_code == 429 or (response.status_code == 403 and (
+            headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in headers
+            or "rate limit" in response.text.lower()
+        ))
+
+    def back_off(self, token, response, attempt):
+        """Cool a rate-limited token down and return the delay chosen."""
+        headers = response.headers
+        now = time.time()
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = parsedate_to_datetime(retry_after).timestamp() - now
+        elif headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in headers:
+            delay = int(headers["X-RateLimit-Reset"]) - now + 1
+        else:
+            # Secondary limits give no hint: exponential backoff with full jitter
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        delay = max(delay, 0)
+        with self._condition:
+            self._cooldowns[token] = max(self._cooldowns.get(token, 0), now + delay)
+            self._condition.notify_all()
+        logger.warning("Rate limited (HTTP %s), token cooling down for %.0fs", response.status_code, delay)
+        return delay
+
+    def status(self, resource="core"):
+        """Remaining budget per token (masked), e.g. for a status line."""
+        now = time.time()
+        with self._condition:
+            return {
+                f"...{token[-4:]}" if token else "anonymous": self._budget(token, resource, now)["remaining"]
+                for token in self.tokens
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(tokens):
+    """The process-wide scheduler of a token pool, so every collector shares its budgets."""
+    key = tuple(tokens)
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = RequestScheduler(key)
+        return _schedulers[key]
@@ -0,0 +1,257 @@
+#sql_store.py
+
+import sqlite3
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from data_collection.storage_backends import TIMESTAMP_COLUMNS, to_typed_frame
+from data_collection.record_batch import RecordBatch
+
+# Per entity: columns, merge key, author column and the date column used for range queries
+SCHEMAS = {
+    "repos": {
+        "columns": {
+            "name": "TEXT", "full_name": "TEXT", "description": "TEXT", "language": "TEXT",
+            "created_at": "TEXT", "updated_at": "TEXT", "stargazers_count": "INTEGER",
+            "forks_count": "INTEGER", "open_issues_count": "INTEGER"
+        },
+        "key": "name", "author": None, "date": "updated_at"
+    },
+    "commits": {
+        # additions / deletions / files_changed are only filled by the git commit source with numstat,
+        # login only by the API source
+        "columns": {
+            "sha": "TEXT", "author": "TEXT", "date": "TEXT", "message": "TEXT",
+            "additions": "INTEGER", "deletions": "INTEGER", "files_changed": "INTEGER", "login": "TEXT"
+        },
+        "key": "sha", "author": "author", "date": "date"
+    },
+    "issues": {
+        "columns": {
+            "id": "INTEGER", "title": "TEXT", "state": "TEXT", "created_at": "TEXT",
+            "updated_at": "TEXT", "closed_at": "TEXT"
+        },
+        "key": "id", "author": None, "date": "created_at"
+    },
+    "forks": {
+        "columns": {"username": "TEXT", "date": "TEXT", "profile_image": "TEXT"},
+        "key": "username", "author": "username", "date": "date"
+    },
+    "pull_requests": {
+        "columns": {
+            "id": "INTEGER", "number": "INTEGER", "title": "TEXT", "created_at": "TEXT",
+            "updated_at": "TEXT", "merged_at": "TEXT", "user": "TEXT"
+        },
+        "key": "id", "author": "user", "date": "created_at"
+    },
+    "reviews": {
+        "columns": {"id": "INTEGER", "pr_id": "INTEGER", "reviewer": "TEXT", "submitted_at": "TEXT", "body": "TEXT"},
+        "key": "id", "author": "reviewer", "date": "submitted_at"
+    },
+}
+
+
+def _timestamp_text(value):
+    """
+    Normalize a timestamp to fixed-width UTC ISO text so that string comparison in SQL
+    orders like time. Sentinels such as "Not Closed" become NULL.
+    """
+    timestamp = pd.to_datetime(value, errors='coerce', utc=True, format='ISO8601')
+    if pd.isna(timestamp):
+        return None
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def _timestamp_column(values):
+    """_timestamp_text over a whole column at once (None where it gives None)."""
+    timestamps = pd.to_datetime(values, errors='coerce', utc=True, format='ISO8601')
+    # numpy formats whole seconds as "YYYY-MM-DDTHH:MM:SS" much faster than strftime
+    text = np.datetime_as_string(timestamps.dt.tz_localize(None).to_numpy(dtype="M8[s]"), unit="s").astype(object)
+    text = text + "+00:00"
+    text[timestamps.isna().to_numpy()] = None
+    return pd.Series(text, index=values.index, dtype=object)
+
+
+def _quote_all(columns):
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+class SQLiteStore:
+    """
+    Embedded SQLite store holding every repository's data, one table per entity.
+    Rows are keyed by (repo, key) and indexed on repo, author and date, so date-window
+    and author filters run inside the database instead of in pandas.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with closing(self._connect()) as conn, conn:
+            for entity, schema in SCHEMAS.items():
+                columns = ", ".join(f'"{name}" {sql_type}' for name, sql_type in schema["columns"].items())
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{entity}" ("repo" TEXT NOT NULL, {columns}, '
+                    f'PRIMARY KEY ("repo", "{schema["key"]}"))'
+                )
+                # Databases created before a column was added get it as a nullable column
+                existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{entity}")')}
+                for name, sql_type in schema["columns"].items():
+                    if name not in existing:
+                        conn.execute(f'ALTER TABLE "{entity}" ADD COLUMN "{name}" {sql_type}')
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "{entity}_repo_date" ON "{entity}" ("repo", "{schema["date"]}")')
+                if schema["author"]:
+                    conn.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{entity}_author" ON "{entity}" ("{schema["author"]}", "repo")'
+                    )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _rows(self, entity, data):
+        """Records (list of dicts, DataFrame or RecordBatch) as a frame of the entity's columns, ready to bind."""
+        columns = list(SCHEMAS[entity]["columns"])
+        if isinstance(data, RecordBatch):
+            data = data.to_pandas()
+        if isinstance(data, dict):
+            data = [data]
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        df = df.reindex(columns=columns)
+        for column in columns:
+            if column in TIMESTAMP_COLUMNS:
+                df[column] = _timestamp_column(df[column])
+        # Python values with None for every kind of missing value, which is what sqlite3 binds
+        return df.astype(object).where(df.notna(), None)
+
+    def _upsert_sql(self, entity):
+        schema = SCHEMAS[entity]
+        columns = list(schema["columns"])
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in columns if c != schema["key"])
+        return (
+            f'INSERT INTO "{entity}" ("repo", {_quote_all(columns)}) VALUES ({", ".join("?" * (len(columns) + 1))}) '
+            f'ON CONFLICT ("repo", "{schema["key"]}") DO UPDATE SET {updates}'
+        )
+
+    def upsert(self, repo, entity, data, replace=False):
+        """
+        Insert or update records (list of dicts, DataFrame or RecordBatch) for a repository
+        by key. With replace=True the repository's existing rows for the entity are dropped first.
+        """
+        df = self._rows(entity, data)
+        with closing(self._connect()) as conn, conn:
+            if replace:
+                conn.execute(f'DELETE FROM "{entity}" WHERE "repo" = ?', (repo,))
+            conn.executemany(self._upsert_sql(entity), ((repo,) + row for row in df.itertuples(index=False, name=None)))
+        return len(df)
+
+    def writer(self, repo, entity):
+        """Chunked replacement of a repository's rows for one entity, see SQLiteWriter."""
+        return SQLiteWriter(self, repo, entity)
+
+    def query(self, entity, repo=None, since=None, until=None, author=None, columns=None):
+        """
+        Load an entity as a typed DataFrame. repo (a name or list of names), the
+        [since, until) window on the entity's date column and author are all applied
+        in SQL using the indexes; columns limits what is read.
+        """
+        schema = SCHEMAS[entity]
+        selected = columns or ["repo"] + list(schema["columns"])
+        clauses, params = [], []
+        if repo is not None:
+            repos = [repo] if isinstance(repo, str) else list(repo)
+            clauses.append(f'"repo" IN ({", ".join("?" * len(repos))})')
+            params.extend(repos)
+        if since is not None:
+            clauses.append(f'"{schema["date"]}" >= ?')
+            params.append(_timestamp_text(since))
+        if until is not None:
+            clauses.append(f'"{schema["date"]}" < ?')
+            params.append(_timestamp_text(until))
+        if author is not None:
+            if not schema["author"]:
+                raise ValueError(f"{entity} records have no author column to filter on")
+            clauses.append(f'"{schema["author"]}" = ?')
+            params.append(author)
+
+        sql = f'SELECT {_quote_all(selected)} FROM "{entity}"'
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        return to_typed_frame(df)
+
+    def get_by_keys(self, repo, entity, data):
+        """Stored rows of a repository whose keys appear in the given records (the rows an upsert would replace)."""
+        key = SCHEMAS[entity]["key"]
+        if isinstance(data, RecordBatch):
+            data = data.to_pandas([key]) if len(data) else pd.DataFrame()
+        if isinstance(data, pd.DataFrame):
+            keys = data[key].tolist() if key in data.columns else []
+        else:
+            keys = [record[key] for record in data]
+        frames = []
+        with closing(self._connect()) as conn:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                frames.append(pd.read_sql_query(
+                    f'SELECT * FROM "{entity}" WHERE "repo" = ? AND "{key}" IN ({", ".join("?" * len(chunk))})',
+                    conn, params=[repo] + chunk
+                ))
+        return to_typed_frame(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame()
+
+    def latest(self, repo, entity, column):
+        """Largest value of a column for one repository, or None (used for watermarks)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(f'SELECT MAX("{column}") FROM "{entity}" WHERE "repo" = ?', (repo,)).fetchone()
+        return row[0]
+
+    def repos(self):
+        """Keys of all repositories in the store (the repo values every query filters on)."""
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute('SELECT "repo" FROM "repos" ORDER BY "repo"')]
+
+    def rename_repo(self, old, new, full_name):
+        """
+        Re-key a repository's rows from old to new in every table, if the repository stored
+        under old is full_name and nothing is stored under new yet. Returns whether it moved.
+        """
+        with closing(self._connect()) as conn, conn:
+            stored = conn.execute('SELECT "full_name" FROM "repos" WHERE "repo" = ?', (old,)).fetchone()
+            if stored is None or stored[0] != full_name:
+                return False
+            if conn.execute('SELECT 1 FROM "repos" WHERE "repo" = ?', (new,)).fetchone():
+                return False
+            for entity in SCHEMAS:
+                conn.execute(f'UPDATE "{entity}" SET "repo" = ? WHERE "repo" = ?', (new, old))
+        return True
+
+
+class SQLiteWriter:
+    """
+    Replaces a repository's rows for one entity chunk by chunk inside one transaction:
+    nothing is visible until close() commits, and abort() keeps the old rows.
+    """
+
+    def __init__(self, store, repo, entity):
+        self.store = store
+        self.repo = repo
+        self.entity = entity
+        self.sql = store._upsert_sql(entity)
+        self.conn = store._connect()
+        # sqlite3 opens the transaction with the delete; it stays open across appends
+        self.conn.execute(f'DELETE FROM "{entity}" WHERE "repo" = ?', (repo,))
+        self.rows = 0
+
+    def append(self, data):
+        df = self.store._rows(self.entity, data)
+        self.conn.executemany(self.sql, ((self.repo,) + row for row in df.itertuples(index=False, name=None)))
+        self.rows += len(df)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def abort(self):
+        self.conn.rollback()
+        self.conn.close()
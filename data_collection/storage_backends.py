@@ -0,0 +1,216 @@
+#storage_backends.py
+
+import pandas as pd
+
+# Columns stored as UTC timestamps; sentinels such as "Not Closed" / "Not Merged" become NaT
+TIMESTAMP_COLUMNS = ("date", "created_at", "updated_at", "closed_at", "merged_at", "submitted_at")
+
+# How CSV files store timestamps: fixed-width UTC ISO 8601, empty when missing
+CSV_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S+00:00"
+
+# Low-cardinality string columns stored as categoricals
+CATEGORICAL_COLUMNS = ("author", "login", "user", "reviewer", "username", "state", "language")
+
+
+def to_typed_frame(df):
+    """Give known columns their analytical dtypes. Columns that are already typed are left alone."""
+    df = df.copy()
+    for column in TIMESTAMP_COLUMNS:
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column], errors='coerce', utc=True, format='ISO8601')
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _to_csv(df, file_path, **kwargs):
+    """Write a chunk as CSV with every timestamp column in CSV_DATE_FORMAT (sentinels and NaT left empty)."""
+    timestamps = {
+        column: pd.to_datetime(df[column], errors='coerce', utc=True, format='ISO8601')
+        for column in TIMESTAMP_COLUMNS if column in df.columns
+    }
+    df.assign(**timestamps).to_csv(file_path, index=False, date_format=CSV_DATE_FORMAT, **kwargs)
+
+
+def _arrow_table(df, schema=None):
+    """
+    Arrow table of one chunk with typed timestamps. Categoricals are written as plain
+    strings (Parquet and Arrow dictionary-encode them anyway), so chunks with different
+    categories share one schema; loads turn them back into categoricals.
+    """
+    import pyarrow as pa
+    df = to_typed_frame(df)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    if schema is not None:
+        df = df.reindex(columns=schema.names)
+        return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Columns that were all null in the first chunk hold strings in later ones
+    fields = [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema]
+    return table.cast(pa.schema(fields))
+
+
+class CSVWriter:
+    """Appends chunks to a CSV file, writing the header with the first one."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.columns = None
+        self.rows = 0
+
+    def append(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            _to_csv(df, self.file_path)
+        else:
+            _to_csv(df.reindex(columns=self.columns), self.file_path, mode="a", header=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.columns is None:
+            open(self.file_path, "w").close()
+
+
+class ParquetWriter:
+    """Writes each chunk as a Parquet row group, so only one chunk is ever in memory."""
+
+    def __init__(self, file_path, compression):
+        self.file_path = file_path
+        self.compression = compression
+        self.writer = None
+        self.rows = 0
+
+    def append(self, df):
+        import pyarrow.parquet as pq
+        if self.writer is None:
+            table = _arrow_table(df)
+            self.writer = pq.ParquetWriter(self.file_path, table.schema, compression=self.compression)
+        else:
+            table = _arrow_table(df, self.writer.schema)
+        self.writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        else:
+            pd.DataFrame().to_parquet(self.file_path, index=False)
+
+
+class FeatherWriter:
+    """Writes each chunk as a record batch of an Arrow IPC (Feather v2) file."""
+
+    def __init__(self, file_path, compression):
+        self.file_path = file_path
+        self.compression = compression
+        self.writer = None
+        self.schema = None
+        self.rows = 0
+
+    def append(self, df):
+        import pyarrow as pa
+        table = _arrow_table(df, self.schema)
+        if self.writer is None:
+            self.schema = table.schema
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self.writer = pa.ipc.new_file(self.file_path, self.schema, options=options)
+        self.writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        else:
+            pd.DataFrame().to_feather(self.file_path)
+
+
+class CSVBackend:
+    """
+    Plain CSV files. Timestamps are written as UTC ISO text in one fixed format, with
+    sentinels such as "Not Closed" left empty; reads return that text untyped, so readers
+    go through to_typed_frame (DataStorage.load_frame) or the metrics normalizers.
+    """
+    extension = ".csv"
+
+    def write(self, df, file_path):
+        _to_csv(df, file_path)
+
+    def read(self, file_path, columns=None):
+        try:
+            df = pd.read_csv(file_path)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+        # CSV cannot skip columns on disk, but filtering keeps the contract of the columnar backends
+        return df[[c for c in columns if c in df.columns]] if columns else df
+
+    def writer(self, file_path):
+        return CSVWriter(file_path)
+
+
+class ParquetBackend:
+    """Compressed Parquet files with typed timestamp and categorical columns."""
+    extension = ".parquet"
+
+    def __init__(self, compression="zstd"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("The parquet storage backend requires pyarrow (pip install pyarrow)")
+        self.compression = compression
+
+    def write(self, df, file_path):
+        to_typed_frame(df).to_parquet(file_path, index=False, compression=self.compression)
+
+    def read(self, file_path, columns=None):
+        if columns:
+            # Only project columns the file actually has, like the CSV backend
+            import pyarrow.parquet as pq
+            available = pq.read_schema(file_path).names
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(file_path, columns=columns or None)
+
+    def writer(self, file_path):
+        return ParquetWriter(file_path, self.compression)
+
+
+class FeatherBackend:
+    """Arrow IPC (Feather v2) files: typed like Parquet, with faster, lighter compression."""
+    extension = ".feather"
+
+    def __init__(self, compression="lz4"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("The feather storage backend requires pyarrow (pip install pyarrow)")
+        self.compression = compression
+
+    def write(self, df, file_path):
+        to_typed_frame(df).reset_index(drop=True).to_feather(file_path, compression=self.compression)
+
+    def read(self, file_path, columns=None):
+        if columns:
+            import pyarrow.ipc as ipc
+            with ipc.open_file(file_path) as reader:
+                available = reader.schema.names
+            columns = [c for c in columns if c in available]
+        return pd.read_feather(file_path, columns=columns or None)
+
+    def writer(self, file_path):
+        return FeatherWriter(file_path, self.compression)
+
+
+BACKENDS = {
+    "csv": CSVBackend,
+    "parquet": ParquetBackend,
+    "feather": FeatherBackend,
+}
+
+
+def get_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
@@ -0,0 +1,170 @@
+#cache.py
+
+import os
+import json
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def data_version(repo_data, watermarks, rows=None):
+    """
+    Version of a repository's stored data: its sync watermarks plus the repository
+    counters, which change without touching any synced entity. rows are the stored
+    row counts per entity, which change when a full refresh drops rows the watermarks
+    never see.
+    """
+    version = {
+        "watermarks": watermarks or {},
+        "counts": [repo_data.get(field) for field in ("stargazers_count", "forks_count", "open_issues_count")],
+        "rows": rows or {},
+    }
+    return hashlib.sha256(json.dumps(version, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def frames_size(frames):
+    """In-memory size of a dict of DataFrames, taken from pandas instead of pickling them."""
+    return int(sum(df.memory_usage(index=True, deep=True).sum() for df in frames.values()))
+
+
+class _MemoryTier:
+    """LRU dict bounded by the total size of its values; values larger than the bound are not kept."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size), least recently used first
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+
+
+class MetricsCache:
+    """
+    LRU cache of computed metrics keyed by (repo full_name, data version, metric set),
+    so reruns look results up by a short key instead of hashing the raw data.
+
+    The memory tier is bounded by max_bytes (sizes are taken from the pickled value).
+    With disk_dir, results are also kept as pickle files shared by every session and
+    process, bounded by disk_max_bytes and evicted least recently used first.
+
+    Normalized DataFrames that go with the metrics are kept apart (get_or_compute_frames):
+    in memory only, under their own frames_max_bytes budget and sized by pandas, so
+    they are never pickled and a large repository's frames do not push out the metrics.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, disk_max_bytes=256 * 1024 * 1024,
+                 frames_max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = _MemoryTier(max_bytes)
+        self._frames = _MemoryTier(frames_max_bytes)
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, full_name, version, metric_set):
+        return hashlib.sha256(f"{full_name}\0{version}\0{metric_set}".encode()).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def get(self, key):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    payload = f.read()
+                value = pickle.loads(payload)
+            except Exception as e:
+                print(f"Error reading cached metrics {key}: {e}")
+                return None
+            os.utime(self._disk_path(key))  # mtime keeps the disk LRU order
+            with self._lock:
+                self._memory.put(key, value, len(payload))
+                self.hits += 1
+            return value
+        return None
+
+    def put(self, key, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._memory.put(key, value, len(payload))
+        if self.disk_dir:
+            tmp_path = f"{self._disk_path(key)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._disk_path(key))
+            self._evict_disk()
+
+    def get_or_compute(self, full_name, version, metric_set, compute):
+        """Cached metrics for the key, calling compute() only on a miss."""
+        key = self.key(full_name, version, metric_set)
+        value = self.get(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def get_or_compute_frames(self, full_name, version, metric_set, compute):
+        """Cached dict of DataFrames for the key, calling compute() only on a miss (memory only)."""
+        key = self.key(full_name, version, metric_set)
+        with self._lock:
+            frames = self._frames.get(key)
+        if frames is None:
+            frames = compute()
+            with self._lock:
+                self._frames.put(key, frames, frames_size(frames))
+        return frames
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.disk_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses, "entries": len(self._memory), "bytes": self._memory.total_bytes,
+                "frame_entries": len(self._frames), "frame_bytes": self._frames.total_bytes
+            }
@@ -0,0 +1,158 @@
+import re
+from functools import cached_property
+import pandas as pd
+from metrics.engine import normalize_commits, normalize_pull_requests, normalize_reviews
+
+# Columns of ContributorEngine.summary(), in display order
+CONTRIBUTOR_COLUMNS = [
+    "rank", "contributor", "commits", "prs_opened", "prs_merged", "merge_hours", "first_review_hours",
+    "reviews_given", "prs_reviewed", "review_turnaround_hours", "review_share",
+]
+
+# Ranking order: merged pull requests first, then commits, then reviews given
+RANK_BY = ["prs_merged", "commits", "reviews_given"]
+
+COUNT_COLUMNS = ["commits", "prs_opened", "prs_merged", "reviews_given", "prs_reviewed"]
+
+HOUR = pd.Timedelta(hours=1)
+
+
+def _name_key(name):
+    """Key for matching display names to logins: lowercase letters and digits only."""
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def _by_contributor(series):
+    """A per-contributor aggregate indexed by plain strings, so aggregates over differently typed keys align."""
+    series.index = series.index.astype(str)
+    return series
+
+
+def reconcile_authors(commits, logins=()):
+    """
+    GitHub login behind each commit where it can be told, else the author name:
+
+    1. the commit's own login (REST commits by linked accounts carry one);
+    2. the login other commits by the same author name carry (git mirror commits have none);
+    3. one of `logins` (e.g. pull request authors) equal to the name once case and
+       punctuation are ignored ("Jane Doe" and "jane-doe" both match "JaneDoe").
+
+    Matching runs over the distinct author names, not over the rows.
+    """
+    if commits.empty or "author" not in commits.columns:
+        return pd.Series(index=commits.index, dtype=object)
+    authors = commits["author"].astype("category")
+    by_key = {}
+    for login in logins:
+        by_key.setdefault(_name_key(login), login)
+
+    mapping = {}
+    has_login = "login" in commits.columns
+    if has_login:
+        linked = commits.loc[commits["login"].notna(), ["author", "login"]].drop_duplicates("author")
+        mapping = dict(zip(linked["author"].astype(str), linked["login"].astype(str)))
+    for name in authors.cat.categories:
+        if name not in mapping:
+            mapping[name] = by_key.get(_name_key(name), name)
+
+    contributors = authors.map(mapping).astype(object)
+    if has_login:
+        contributors = commits["login"].astype(object).where(commits["login"].notna(), contributors)
+    return contributors
+
+
+class ContributorEngine:
+    """
+    Per-contributor metrics of a repository: commits and pull request throughput, merge
+    latency, time to first review on the pull requests they open, and the reviews they
+    give (load, turnaround). Expects the same data dict as MetricsEngine.
+
+    Reviews are joined to their pull requests with one merge on the integer ids and
+    every metric is a group-by over logins, so millions of reviews take seconds.
+    Self-reviews are not counted as reviews of a pull request.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    @cached_property
+    def commits(self):
+        return normalize_commits(self.data.get('commits', []))
+
+    @cached_property
+    def pull_requests(self):
+        pull_requests = normalize_pull_requests(self.data.get('pull_requests', []))
+        if not pull_requests.empty:
+            pull_requests['merge_hours'] = (pull_requests['merged_at'] - pull_requests['created_at']) / HOUR
+        return pull_requests
+
+    @cached_property
+    def reviews(self):
+        return normalize_reviews(self.data.get('reviews', []))
+
+    @cached_property
+    def review_events(self):
+        """Reviews by someone other than the author, with the pull request's author and hours since it opened."""
+        reviews, pull_requests = self.reviews, self.pull_requests
+        if reviews.empty or pull_requests.empty or 'pr_id' not in reviews.columns:
+            return pd.DataFrame(columns=['pr_id', 'reviewer', 'author', 'hours'])
+        events = reviews[['pr_id', 'reviewer', 'submitted_at']].merge(
+            pull_requests[['id', 'user', 'created_at']].rename(columns={'id': 'pr_id', 'user': 'author'}),
+            on='pr_id', how='inner'
+        )
+        events = events[events['reviewer'].astype(object) != events['author'].astype(object)]
+        events['hours'] = (events['submitted_at'] - events['created_at']) / HOUR
+        return events[['pr_id', 'reviewer', 'author', 'hours']]
+
+    def commit_counts(self):
+        if self.commits.empty:
+            return pd.Series(dtype='int64')
+        logins = self.pull_requests['user'].dropna().unique() if 'user' in self.pull_requests.columns else ()
+        return _by_contributor(reconcile_authors(self.commits, logins).value_counts())
+
+    def author_stats(self):
+        """Pull requests opened and merged, median merge hours and median hours to the first review, per author."""
+        pull_requests = self.pull_requests
+        if pull_requests.empty:
+            return pd.DataFrame()
+        grouped = pull_requests.groupby('user', observed=True)
+        stats = pd.DataFrame({
+            'prs_opened': _by_contributor(grouped.size()),
+            'prs_merged': _by_contributor(grouped['merged_at'].count()),
+            'merge_hours': _by_contributor(grouped['merge_hours'].median()),
+        })
+        events = self.review_events
+        if not events.empty:
+            first_reviews = events.groupby('pr_id').agg(author=('author', 'first'), hours=('hours', 'min'))
+            stats['first_review_hours'] = _by_contributor(first_reviews.groupby('author', observed=True)['hours'].median())
+        return stats
+
+    def reviewer_stats(self):
+        """Reviews given, pull requests reviewed, share of all reviews and median turnaround hours, per reviewer."""
+        events = self.review_events
+        if events.empty:
+            return pd.DataFrame()
+        # Turnaround is how long after a pull request opened the reviewer first responded to it
+        first_responses = events.groupby(['reviewer', 'pr_id'], observed=True)['hours'].min()
+        grouped = events.groupby('reviewer', observed=True)
+        return pd.DataFrame({
+            'reviews_given': _by_contributor(grouped.size()),
+            'prs_reviewed': _by_contributor(first_responses.groupby(level='reviewer', observed=True).size()),
+            'review_turnaround_hours': _by_contributor(first_responses.groupby(level='reviewer', observed=True).median()),
+            'review_share': _by_contributor(grouped.size() / len(events)),
+        })
+
+    def summary(self):
+        """One row per contributor with every metric, ranked by RANK_BY (an empty frame without data)."""
+        parts = [self.commit_counts().to_frame('commits'), self.author_stats(), self.reviewer_stats()]
+        parts = [part for part in parts if not part.empty]
+        if not parts:
+            return pd.DataFrame(columns=CONTRIBUTOR_COLUMNS)
+        stats = pd.concat(parts, axis=1)
+        stats = stats.reindex(columns=CONTRIBUTOR_COLUMNS[2:])
+        stats[COUNT_COLUMNS] = stats[COUNT_COLUMNS].fillna(0).astype('int64')
+        stats['review_share'] = stats['review_share'].fillna(0.0)
+        stats = stats.rename_axis('contributor').reset_index()
+        stats = stats.sort_values(RANK_BY + ['contributor'], ascending=[False] * len(RANK_BY) + [True], ignore_index=True)
+        stats.insert(0, 'rank', range(1, len(stats) + 1))
+        return stats[CONTRIBUTOR_COLUMNS]
@@ -0,0 +1,216 @@
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Union
+import pandas as pd
+
+# Metrics are either a value or a message explaining why it could not be computed
+MetricFrame = Union[pd.DataFrame, str]
+MetricValue = Union[float, str]
+
+
+@dataclass
+class DashboardMetrics:
+    """Every metric the dashboard shows, computed in one pass by MetricsEngine.compute()."""
+    commit_frequency: MetricFrame
+    issue_resolution: MetricValue
+    issue_counts_by_month: MetricFrame
+    issue_pie_chart_data: MetricFrame
+    pr_merge_rate: MetricValue
+    avg_comments_per_pr: MetricValue
+
+
+def _frame(data):
+    if isinstance(data, pd.DataFrame):
+        return data.copy()
+    if hasattr(data, "to_pandas"):
+        # A RecordBatch (data_collection.record_batch): typed columns, nothing left to parse
+        return data.to_pandas()
+    return pd.DataFrame(data if data is not None else [])
+
+
+def to_utc(series):
+    """Typed UTC timestamps; unparseable values and sentinels ("Not Closed") become NaT."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series if series.dt.tz is not None else series.dt.tz_localize('UTC')
+    return pd.to_datetime(series, errors='coerce', utc=True, format='ISO8601')
+
+
+def _month(series):
+    """Month period key of a UTC timestamp column (dropping the zone first avoids a pandas warning)."""
+    return series.dt.tz_localize(None).dt.to_period('M')
+
+
+def normalize_commits(data):
+    commits = _frame(data)
+    if not commits.empty:
+        commits['date'] = to_utc(commits['date'])
+        commits['month'] = _month(commits['date'])
+    return commits
+
+
+def normalize_issues(data):
+    issues = _frame(data)
+    if not issues.empty:
+        issues['created_at'] = to_utc(issues['created_at'])
+        issues['closed_at'] = to_utc(issues['closed_at'])
+        issues['month'] = _month(issues['created_at'])
+        issues['resolution_time'] = (issues['closed_at'] - issues['created_at']).dt.days
+    return issues
+
+
+def normalize_reviews(data):
+    reviews = _frame(data)
+    if not reviews.empty and 'submitted_at' in reviews.columns:
+        reviews['submitted_at'] = to_utc(reviews['submitted_at'])
+        reviews['month'] = _month(reviews['submitted_at'])
+    return reviews
+
+
+def normalize_pull_requests(data):
+    pull_requests = _frame(data)
+    if not pull_requests.empty:
+        pull_requests['created_at'] = to_utc(pull_requests['created_at'])
+        pull_requests['merged_at'] = to_utc(pull_requests['merged_at'])
+        pull_requests['month'] = _month(pull_requests['created_at'])
+        pull_requests['time_to_merge'] = (pull_requests['merged_at'] - pull_requests['created_at']).dt.days
+    return pull_requests
+
+
+class MetricsEngine:
+    """
+    Normalizes each entity once (typed timestamps, month keys, resolution and merge
+    durations) and computes the dashboard metrics from those frames with vectorized
+    group-bys. Expects the same data dict as MetricsCalculator, optionally with
+    "pull_requests" and "reviews".
+
+    When precomputed rollups (metrics.rollups.RepoRollups) are given, the aggregate
+    metrics are read from them, and raw frames are only normalized if a metric still
+    needs them.
+    """
+
+    def __init__(self, data, rollups=None):
+        self.data = data
+        self.repo_data = data.get('repo', {})
+        self.rollups = rollups
+
+    @cached_property
+    def commits(self):
+        return normalize_commits(self.data.get('commits', []))
+
+    @cached_property
+    def issues(self):
+        return normalize_issues(self.data.get('issues', []))
+
+    @cached_property
+    def pull_requests(self):
+        return normalize_pull_requests(self.data.get('pull_requests', []))
+
+    @cached_property
+    def reviews(self):
+        return normalize_reviews(self.data.get('reviews', []))
+
+    @cached_property
+    def validity_message(self):
+        stars_count = self.repo_data.get('stargazers_count', 0)
+        forks_count = self.repo_data.get('forks_count', 0)
+        open_issues_count = self.repo_data.get('open_issues_count', 0)
+        commit_count = self.rollups.total('commits') if self.rollups else len(self.commits)
+
+        if stars_count == 0 and forks_count == 0 and open_issues_count == 0 and commit_count == 0:
+            return "Need more information. The repository has no stars, forks, open issues, or commits."
+        return None
+
+    def commit_frequency(self):
+        """Commit counts per month."""
+        if self.validity_message:
+            return self.validity_message
+        if self.rollups:
+            return self.rollups.commit_frequency()
+        if self.commits.empty:
+            return "No commit data available."
+        try:
+            commit_frequency = self.commits.groupby('month').size().reset_index(name='count')
+            commit_frequency['date'] = commit_frequency.pop('month').dt.to_timestamp()  # Timestamp for Plotly
+            return commit_frequency[['date', 'count']]
+        except Exception as e:
+            print(f"Error calculating commit frequency: {e}")
+            return pd.DataFrame()
+
+    def issue_resolution_time(self):
+        """Average issue resolution time in days."""
+        if self.validity_message:
+            return self.validity_message
+        if self.rollups:
+            return self.rollups.issue_resolution_time()
+        if self.issues.empty:
+            return "No issue data available."
+        return self.issues['resolution_time'].mean()
+
+    def issue_counts_by_month(self):
+        """Opened, resolved and unresolved issue counts per creation month, aligned by month."""
+        if self.validity_message:
+            return self.validity_message
+        if self.rollups:
+            return self.rollups.issue_counts_by_month()
+        if self.issues.empty:
+            return "No issue data available."
+        try:
+            issue_counts = self.issues.groupby('month').agg(
+                count=('created_at', 'size'),
+                resolved_issues=('closed_at', 'count')
+            ).reset_index()
+            issue_counts['unresolved_issues'] = issue_counts['count'] - issue_counts['resolved_issues']
+            issue_counts = issue_counts.rename(columns={'month': 'created_at'})
+            issue_counts['date'] = issue_counts['created_at'].dt.to_timestamp()
+            return issue_counts
+        except Exception as e:
+            print(f"Error calculating issue counts by month: {e}")
+            return pd.DataFrame()
+
+    def issue_pie_chart_data(self):
+        """Resolved vs unresolved issue totals."""
+        if self.validity_message:
+            return self.validity_message
+        if self.rollups:
+            return self.rollups.issue_pie_chart_data()
+        if self.issues.empty:
+            return "No issue data available."
+        unresolved_issues = int(self.issues['closed_at'].isna().sum())
+        return pd.DataFrame({
+            'Issue Status': ['Resolved', 'Unresolved'],
+            'Count': [len(self.issues) - unresolved_issues, unresolved_issues]
+        })
+
+    def pr_merge_rate(self, pull_requests=None):
+        """Average time to merge pull requests in days."""
+        if self.validity_message:
+            return self.validity_message
+        if pull_requests is None and self.rollups:
+            return self.rollups.pr_merge_rate()
+        pull_requests = self.pull_requests if pull_requests is None else pull_requests
+        if pull_requests.empty:
+            return "No pull request data available."
+        return pull_requests['time_to_merge'].mean()
+
+    def code_review_metrics(self, reviews=None):
+        """Average number of reviews per reviewed pull request."""
+        reviews = self.reviews if reviews is None else reviews
+        if self.validity_message:
+            return self.validity_message
+        if 'pr_id' not in reviews.columns:
+            print("Error calculating code review metrics: Missing 'pr_id' column in reviews data")
+            return float('nan')
+        if reviews.empty:
+            return "No code review data available."
+        return reviews.groupby('pr_id').size().mean()
+
+    def compute(self):
+        """Compute every dashboard metric from the normalized frames."""
+        return DashboardMetrics(
+            commit_frequency=self.commit_frequency(),
+            issue_resolution=self.issue_resolution_time(),
+            issue_counts_by_month=self.issue_counts_by_month(),
+            issue_pie_chart_data=self.issue_pie_chart_data(),
+            pr_merge_rate=self.pr_merge_rate(),
+            avg_comments_per_pr=self.code_review_metrics()
+        )
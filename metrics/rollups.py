@@ -0,0 +1,198 @@
+import os
+import pandas as pd
+from metrics.engine import normalize_commits, normalize_issues, normalize_pull_requests, normalize_reviews
+from metrics.sketches import SketchStore, SketchAccumulator, SKETCH_DEFINITIONS
+
+# (rollup, timestamp column, key column, column that must be set, summed value column)
+# Rows are counted (or their value column summed) into the period of the timestamp column.
+ROLLUP_DEFINITIONS = {
+    "commits": [
+        ("commits", "date", "author", None, None),
+    ],
+    "issues": [
+        ("issues_opened", "created_at", None, None, None),
+        ("issues_resolved", "created_at", None, "closed_at", None),
+        ("issues_closed", "closed_at", None, None, None),
+        ("issue_resolution_days", "created_at", None, "closed_at", "resolution_time"),
+    ],
+    "pull_requests": [
+        ("prs_created", "created_at", "user", None, None),
+        ("prs_merged", "merged_at", "user", None, None),
+        ("pr_merge_days", "created_at", None, "merged_at", "time_to_merge"),
+    ],
+    "reviews": [
+        ("reviews", "submitted_at", "reviewer", None, None),
+    ],
+}
+
+GRAINS = {"M": "%Y-%m", "D": "%Y-%m-%d"}
+
+ROLLUP_COLUMNS = ["entity", "rollup", "grain", "period", "key", "value"]
+
+NORMALIZERS = {
+    "commits": normalize_commits,
+    "issues": normalize_issues,
+    "pull_requests": normalize_pull_requests,
+    "reviews": normalize_reviews,
+}
+
+
+def contributions(entity, data):
+    """Rollup rows contributed by a batch of records of one entity, at every grain."""
+    df = NORMALIZERS[entity](data)
+    parts = []
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    for rollup, time_column, key_column, required_column, value_column in ROLLUP_DEFINITIONS[entity]:
+        if time_column not in df.columns:
+            continue
+        rows = df[df[time_column].notna()]
+        if required_column:
+            rows = rows[rows[required_column].notna()]
+        if rows.empty:
+            continue
+        keys = rows[key_column].astype(str) if key_column in rows.columns else pd.Series("", index=rows.index)
+        values = rows[value_column] if value_column else pd.Series(1, index=rows.index)
+        for grain, period_format in GRAINS.items():
+            grouped = values.groupby([rows[time_column].dt.strftime(period_format), keys]).sum()
+            part = grouped.rename_axis(["period", "key"]).reset_index(name="value")
+            part["entity"], part["rollup"], part["grain"] = entity, rollup, grain
+            parts.append(part[ROLLUP_COLUMNS])
+
+    if not parts:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _aggregate(frames):
+    """Sum rollup rows with the same entity, rollup, grain, period and key."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    combined = pd.concat(frames, ignore_index=True)
+    rollups = combined.groupby(ROLLUP_COLUMNS[:-1], as_index=False)["value"].sum()
+    return rollups[rollups["value"] != 0]
+
+
+class RollupAccumulator:
+    """
+    Builds one entity's rollups (and quantile sketches) from a stream of record batches.
+    Each batch is reduced to its contributions right away, so memory follows the number
+    of periods and keys rather than the number of records.
+    """
+
+    def __init__(self, entity):
+        self.entity = entity
+        self.rollups = pd.DataFrame(columns=ROLLUP_COLUMNS)
+        self.sketches = SketchAccumulator(entity)
+
+    def add(self, data):
+        self.rollups = _aggregate([self.rollups, contributions(self.entity, data)])
+        self.sketches.add(data)
+
+
+class RollupStore:
+    """
+    Materialized monthly and daily rollups per repository, kept in <repo>_rollups.csv.
+    DataStorage updates them with each ingested delta: the contributions of replaced
+    rows are subtracted and those of the new rows added, so the cost follows the size
+    of the delta and of the rollup table, not the repository's history.
+
+    The resolution and merge time quantile sketches (metrics.sketches) are kept the
+    same way, in <repo>_sketches.json.
+    """
+
+    def __init__(self, storage_dir="data"):
+        self.storage_dir = storage_dir
+        self.sketches = SketchStore(storage_dir)
+
+    def _path(self, repo_name):
+        return os.path.join(self.storage_dir, f"{repo_name}_rollups.csv")
+
+    def load(self, repo_name):
+        file_path = self._path(repo_name)
+        if not os.path.exists(file_path):
+            return pd.DataFrame(columns=ROLLUP_COLUMNS)
+        return pd.read_csv(file_path, dtype={"period": str, "key": str}, keep_default_na=False)
+
+    def update(self, repo_name, entity, new_rows, replaced_rows=None, rebuild=False):
+        """
+        Apply one ingest to the rollups. replaced_rows are the stored versions of records
+        that new_rows overwrite; rebuild=True discards the entity's rollups first (full refresh).
+        """
+        current = self.load(repo_name)
+        if rebuild:
+            current = current[current["entity"] != entity]
+
+        parts = [current, contributions(entity, new_rows)]
+        if replaced_rows is not None and len(replaced_rows):
+            removed = contributions(entity, replaced_rows)
+            removed["value"] = -removed["value"]
+            parts.append(removed)
+
+        rollups = _aggregate(parts)
+        rollups.to_csv(self._path(repo_name), index=False)
+        self.sketches.update(repo_name, entity, new_rows, replaced_rows, rebuild)
+        return rollups
+
+    def replace(self, repo_name, accumulator):
+        """Swap in an entity's rollups built by a RollupAccumulator (full refresh)."""
+        current = self.load(repo_name)
+        rollups = _aggregate([current[current["entity"] != accumulator.entity], accumulator.rollups])
+        rollups.to_csv(self._path(repo_name), index=False)
+        if accumulator.entity in SKETCH_DEFINITIONS:
+            self.sketches.replace(repo_name, accumulator.sketches)
+        return rollups
+
+    def for_repo(self, repo_name):
+        return RepoRollups(self.load(repo_name))
+
+
+class RepoRollups:
+    """Read side of one repository's rollups, shaped like the MetricsEngine outputs."""
+
+    def __init__(self, rollups):
+        self.rollups = rollups
+
+    def series(self, rollup, grain="M", by_key=False):
+        """Values of a rollup per period (and per key when by_key is set)."""
+        rows = self.rollups[(self.rollups["rollup"] == rollup) & (self.rollups["grain"] == grain)]
+        group = ["period", "key"] if by_key else ["period"]
+        return rows.groupby(group, as_index=False)["value"].sum().sort_values(group, ignore_index=True)
+
+    def total(self, rollup):
+        return self.series(rollup)["value"].sum()
+
+    def commit_frequency(self):
+        commits = self.series("commits")
+        return pd.DataFrame({"date": pd.to_datetime(commits["period"]), "count": commits["value"].astype(int)})
+
+    def issue_counts_by_month(self):
+        opened = self.series("issues_opened").set_index("period")["value"]
+        resolved = self.series("issues_resolved").set_index("period")["value"]
+        resolved = resolved.reindex(opened.index, fill_value=0)
+        issue_counts = pd.DataFrame({
+            "created_at": pd.PeriodIndex(opened.index, freq="M"),
+            "count": opened.values.astype(int),
+            "resolved_issues": resolved.values.astype(int),
+        })
+        issue_counts["unresolved_issues"] = issue_counts["count"] - issue_counts["resolved_issues"]
+        issue_counts["date"] = issue_counts["created_at"].dt.to_timestamp()
+        return issue_counts
+
+    def issue_pie_chart_data(self):
+        total_issues = int(self.total("issues_opened"))
+        resolved_issues = int(self.total("issues_resolved"))
+        return pd.DataFrame({
+            "Issue Status": ["Resolved", "Unresolved"],
+            "Count": [resolved_issues, total_issues - resolved_issues]
+        })
+
+    def issue_resolution_time(self):
+        resolved = self.total("issues_resolved")
+        return self.total("issue_resolution_days") / resolved if resolved else float("nan")
+
+    def pr_merge_rate(self):
+        merged = self.total("prs_merged")
+        return self.total("pr_merge_days") / merged if merged else float("nan")
@@ -1,8 +1,227 @@
 import re
+import math
+import time
+import queue
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+import pandas as pd
 import ollama
 
+# Phrasings of each metric intent; the local classifier matches queries against them
+INTENT_VOCABULARY = {
+    'commit_frequency': [
+        "commit frequency", "how often are commits made", "how many commits per month",
+        "commit activity over time", "show commits over time", "commit history chart",
+        "number of commits", "how many commits", "commits per week",
+    ],
+    'issue_resolution': [
+        "issue resolution time", "how long does it take to resolve issues",
+        "average time to close issues", "how fast are issues fixed", "time to close an issue",
+        "how quickly are bugs resolved", "how long issues stay open before closing",
+    ],
+    'pr_merge_rate': [
+        "pull request merge rate", "how many prs get merged", "pr merge rate",
+        "how long does it take to merge pull requests", "time to merge a pull request",
+        "how fast are pull requests merged", "merged pull requests", "how quickly pull requests get merged",
+    ],
+    'code_review_metrics': [
+        "code review metrics", "how are code reviews performed", "reviews per pull request",
+        "how many reviews does a pr get", "code review activity", "review comments per pr",
+    ],
+}
+
+# Phrasings that mention the same nouns but ask about something the metrics do not cover.
+# A query closest to one of these is not classified, so it goes to the LLM.
+NEGATIVE_EXAMPLES = [
+    "commit messages", "what did the last commit change", "latest commit", "who made the most commits",
+    "top contributors", "who reviewed the most pull requests", "list open issues", "who opened this issue",
+    "issue titles", "pull request titles", "what language is it written in",
+    "number of issues", "how many issues", "number of reviews", "number of forks", "number of stars",
+    "number of contributors", "number of pull requests",
+]
+
+# Words naming each intent's subject; a query must use one of them to get the intent, so
+# counts of other things ("number of issues") never match on the shared "number of"
+INTENT_NOUNS = {
+    'commit_frequency': "commit commits",
+    'issue_resolution': "issue issues bug bugs",
+    'pr_merge_rate': "pull pr prs merge merged",
+    'code_review_metrics': "review reviews",
+}
+
+# Words that carry no intent on their own
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "do", "does", "of", "to", "in", "on", "for", "me", "i", "can",
+    "you", "show", "what", "whats", "what's", "it", "this", "repo", "repository", "please", "get", "see",
+    "there", "tell", "about", "we", "our", "each", "be", "was", "were", "number", "many",
+}
+
+# Abbreviations and variants mapped to the vocabulary's words
+SYNONYMS = {"pr": "pull", "prs": "pull", "pull-request": "pull", "mr": "pull", "bug": "issue", "bugs": "issue",
+            "fix": "resolve", "fixed": "resolve", "close": "resolve", "closed": "resolve", "closing": "resolve"}
+
+
+def normalize_query(query):
+    """Lower-case, drop punctuation and collapse whitespace, so trivially different queries share a cache entry."""
+    return " ".join(re.sub(r"[^\w\s'-]", " ", query.lower()).split())
+
+
+def _tokens(text):
+    tokens = []
+    for word in normalize_query(text).split():
+        word = SYNONYMS.get(word, word)
+        if word in STOP_WORDS:
+            continue
+        # Crude stemming: "commits"/"committed"/"merging" meet their stems
+        for suffix in ("ing", "ed", "es", "s"):
+            if len(word) > len(suffix) + 3 and word.endswith(suffix):
+                word = word[:-len(suffix)]
+                break
+        tokens.append(SYNONYMS.get(word, word))
+    return tokens
+
+
+class IntentClassifier:
+    """
+    TF-IDF nearest-phrase classifier over INTENT_VOCABULARY and NEGATIVE_EXAMPLES. A query
+    gets the intent of its most similar phrase (cosine similarity) when that similarity
+    reaches min_score and beats the best other intent by margin; otherwise, or when the
+    closest phrase is a negative example, it is left to the LLM. Only intents whose
+    INTENT_NOUNS the query uses are candidates, and query words the phrases never use still
+    count towards the query's norm, so a query that is mostly about something else scores low.
+    """
+
+    def __init__(self, vocabulary=INTENT_VOCABULARY, negatives=NEGATIVE_EXAMPLES, nouns=INTENT_NOUNS,
+                 min_score=0.45, margin=0.1):
+        self.min_score = min_score
+        self.margin = margin
+        self.nouns = {intent: set(_tokens(words)) for intent, words in nouns.items()}
+        phrases = [(intent, _tokens(phrase)) for intent, examples in vocabulary.items() for phrase in examples]
+        phrases += [(None, _tokens(phrase)) for phrase in negatives]
+        document_frequency = Counter(token for _, tokens in phrases for token in set(tokens))
+        self.idf = {token: math.log((1 + len(phrases)) / (1 + count)) + 1 for token, count in document_frequency.items()}
+        self.unseen_idf = math.log(1 + len(phrases)) + 1
+        self.phrases = [(intent, self._vector(tokens)) for intent, tokens in phrases]
+
+    def _vector(self, tokens):
+        counts = Counter(tokens)
+        vector = {token: count * self.idf.get(token, self.unseen_idf) for token, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {token: weight / norm for token, weight in vector.items()} if norm else {}
+
+    def scores(self, query):
+        """Best similarity per candidate intent (None for the negative examples)."""
+        tokens = _tokens(query)
+        query_vector = self._vector(tokens)
+        best = {}
+        for intent, vector in self.phrases:
+            if intent is not None and intent in self.nouns and self.nouns[intent].isdisjoint(tokens):
+                continue
+            score = sum(weight * vector.get(token, 0.0) for token, weight in query_vector.items())
+            best[intent] = max(best.get(intent, 0.0), score)
+        return best
+
+    def classify(self, query):
+        """The matching intent, or None when the query is not clearly about one metric."""
+        ranked = sorted(self.scores(query).items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][0] is None or ranked[0][1] < self.min_score:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < self.margin:
+            return None
+        return ranked[0][0]
+
+
+class ResponseCache:
+    """LRU cache of LLM answers by normalized query, each entry expiring after ttl seconds."""
+
+    def __init__(self, max_entries=256, ttl=60 * 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalized query -> (stored at, response)
+
+    def get(self, query):
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, query, response):
+        with self._lock:
+            self._entries[normalize_query(query)] = (time.monotonic(), response)
+            self._entries.move_to_end(normalize_query(query))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _format_value(value, unit=""):
+    if isinstance(value, (int, float)) and not pd.isna(value):
+        return f"{value:.2f}{unit}"
+    return str(value)
+
+
+def build_metrics_context(repo_data, metrics, max_chars=1500, recent_months=12, top_authors=5):
+    """
+    Compact text summary of a repository's computed dashboard metrics (load_data's output)
+    for grounding LLM answers: repository counters, headline averages, the most recent
+    monthly series and the most active PR authors. Cut to max_chars so the prompt stays small.
+    """
+    lines = [
+        f"Repository: {repo_data.get('full_name', repo_data.get('name'))} ({repo_data.get('language')})",
+        f"Stars: {repo_data.get('stargazers_count')}, forks: {repo_data.get('forks_count')}, "
+        f"open issues: {repo_data.get('open_issues_count')}",
+        f"Average issue resolution time: {_format_value(metrics.get('issue_resolution'), ' days')}",
+        f"Average time to merge a pull request: {_format_value(metrics.get('pr_merge_rate'), ' days')}",
+        f"Average reviews per reviewed pull request: {_format_value(metrics.get('avg_comments_per_pr'))}",
+    ]
+
+    commit_frequency = metrics.get('commit_frequency')
+    if isinstance(commit_frequency, pd.DataFrame) and not commit_frequency.empty:
+        recent = commit_frequency.sort_values('date').tail(recent_months)
+        series = ", ".join(f"{date:%Y-%m}: {count}" for date, count in zip(recent['date'], recent['count']))
+        lines.append(f"Commits per month (total {int(commit_frequency['count'].sum())}): {series}")
+
+    issue_counts = metrics.get('issue_counts_by_month')
+    if isinstance(issue_counts, pd.DataFrame) and not issue_counts.empty:
+        recent = issue_counts.sort_values('date').tail(recent_months)
+        series = ", ".join(
+            f"{date:%Y-%m}: {opened} opened/{resolved} resolved"
+            for date, opened, resolved in zip(recent['date'], recent['count'], recent['resolved_issues'])
+        )
+        lines.append(f"Issues per month: {series}")
+
+    pr_df = metrics.get('pr_df')
+    if isinstance(pr_df, pd.DataFrame) and not pr_df.empty and 'user' in pr_df.columns:
+        merged = pr_df['merged_at'].notna().sum() if 'merged_at' in pr_df.columns else 0
+        authors = pr_df['user'].astype(str).value_counts().head(top_authors)
+        lines.append(f"Pull requests: {len(pr_df)} ({merged} merged). Most active authors: "
+                     + ", ".join(f"{user} ({count})" for user, count in authors.items()))
+
+    context = "\n".join(lines)
+    return context if len(context) <= max_chars else context[:max_chars - 3] + "..."
+
+
 class NLPProcessor:
-    def __init__(self):
+    def __init__(self, client=None, model='llama3.1:8b', classifier=None, cache=None, keep_alive="30m"):
+        """
+        Queries are answered by the first tier that can: the exact metric patterns, the
+        local IntentClassifier, the ResponseCache of earlier LLM answers, and only then
+        the LLM. client is anything with ollama's chat(model=..., messages=..., stream=...,
+        keep_alive=...) (the ollama module by default), so a stub can stand in for it.
+        keep_alive keeps the model loaded between questions.
+        """
+        self.client = client or ollama
+        self.model = model
+        self.keep_alive = keep_alive
+        self.classifier = classifier or IntentClassifier()
+        self.cache = cache or ResponseCache()
         # Define query patterns for common metrics
         self.query_patterns = {
             'commit_frequency': re.compile(r'\bcommit frequency\b', re.IGNORECASE),
@@ -14,33 +233,117 @@ class NLPProcessor:
     def process_query(self, query):
         """
         Process the user's natural language query and return the appropriate result.
-        If the query matches predefined patterns, return the corresponding metric type.
-        Otherwise, send the query to the Ollama LLM model for further processing.
+        If the query matches predefined patterns or the intent classifier, return the
+        corresponding metric type. Otherwise, answer from the response cache or send the
+        query to the Ollama LLM model for further processing.
         """
         query = query.strip().lower()
 
-        # Check if the query matches any predefined patterns
-        for key, pattern in self.query_patterns.items():
-            if pattern.search(query):
-                return key
+        intent = self.match_intent(query)
+        if intent:
+            return intent
+
+        cached_response = self.cache.get(query)
+        if cached_response is not None:
+            return cached_response
 
         # If no predefined patterns match, use Ollama LLM for query processing
         try:
-            desired_model = 'llama3.1:8b'
-
             # Send query to Ollama model
-            response = ollama.chat(model=desired_model, messages=[
-                {
-                    'role': 'user',
-                    'content': query,
-                },
-            ])
+            response = self.client.chat(model=self.model, messages=self._messages(query), keep_alive=self.keep_alive)
 
             # Extract the response message from Ollama's output
             llm_response = response['message']['content']
+            self.cache.put(query, llm_response)
 
             return llm_response
 
         except Exception as e:
             # Handle exceptions related to the LLM model
             return f"Error processing query: {str(e)}"
+
+    def match_intent(self, query):
+        """The metric a query asks for (exact pattern first, then the classifier), or None."""
+        query = query.strip().lower()
+        # Check if the query matches any predefined patterns
+        for key, pattern in self.query_patterns.items():
+            if pattern.search(query):
+                return key
+        # Paraphrases of the metrics ("how often are commits made") are classified locally
+        return self.classifier.classify(query)
+
+    def _messages(self, query, context=None):
+        messages = []
+        if context:
+            messages.append({
+                'role': 'system',
+                'content': "You answer questions about a GitHub repository. Use these computed metrics "
+                           "and say so when they do not cover the question:\n" + context,
+            })
+        messages.append({'role': 'user', 'content': query})
+        return messages
+
+    def warm_up(self):
+        """Load the model in the background, so the first question does not pay for it."""
+        def load():
+            try:
+                # An empty conversation loads the model without generating anything
+                self.client.chat(model=self.model, messages=[], keep_alive=self.keep_alive)
+            except Exception as e:
+                print(f"Error warming up {self.model}: {e}")
+        threading.Thread(target=load, daemon=True).start()
+
+    def stream_answer(self, query, context=None, first_token_timeout=30, timeout=120):
+        """
+        Yield the LLM's answer in pieces as they arrive (for st.write_stream), grounded in
+        context (see build_metrics_context). The request runs on a worker thread: the
+        stream ends with a notice if no token arrives within first_token_timeout or the
+        whole answer takes longer than timeout, and closing the generator (e.g. on a
+        Streamlit rerun) cancels it. Complete answers are cached per query and context.
+        """
+        query = query.strip().lower()
+        cache_key = f"{query} {hashlib.sha256((context or '').encode()).hexdigest()[:12]}"
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
+            yield cached_response
+            return
+
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                stream = self.client.chat(model=self.model, messages=self._messages(query, context),
+                                          stream=True, keep_alive=self.keep_alive)
+                for chunk in stream:
+                    if cancelled.is_set():
+                        break
+                    chunks.put(chunk['message']['content'])
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(done)
+
+        threading.Thread(target=produce, daemon=True).start()
+        started = time.monotonic()
+        parts = []
+        try:
+            while True:
+                remaining = timeout - (time.monotonic() - started)
+                wait = min(first_token_timeout, remaining) if not parts else remaining
+                try:
+                    chunk = chunks.get(timeout=max(wait, 0))
+                except queue.Empty:
+                    yield "\n\n_(The model took too long to answer; try again.)_"
+                    return
+                if chunk is done:
+                    break
+                if isinstance(chunk, Exception):
+                    yield f"Error processing query: {chunk}"
+                    return
+                parts.append(chunk)
+                yield chunk
+            self.cache.put(cache_key, "".join(parts))
+        finally:
+            cancelled.set()
@@ -1,37 +1,289 @@
-# import json
-# from sentence_transformers import SentenceTransformer
-# from sklearn.metrics.pairwise import cosine_similarity
-# from ollama import Ollama
-
-# # Step 1: Load the JSON dataset
-# def load_json_data(file_path):
-#     with open(file_path, "r") as f:
-#         return json.load(f)
-
-# # Step 2: Initialize the embedding model for document retrieval
-# def initialize_embedding_model():
-#     return SentenceTransformer("thenlper/gte-large")
-
-# # Step 3: Compute embeddings for all documents in the dataset
-# def compute_embeddings(json_data, embed_model):
-#     return [embed_model.encode(str(item)) for item in json_data]
-
-# # Step 4: Retrieve the most relevant document based on a query
-# def retrieve_relevant_docs(query, json_data, embeddings, embed_model):
-#     query_embedding = embed_model.encode(query)
-#     similarities = cosine_similarity([query_embedding], embeddings)
-#     best_match_idx = similarities.argmax()
-#     return json_data[best_match_idx]
-
-# # Step 5: Query the LLM (Mistral-7B via Ollama) with the retrieved document and user's question
-# def generate_answer_with_ollama(relevant_doc, query, model_name="ollama-3b"):
-#     # Initialize Ollama LLM
-#     llm = Ollama(model=model_name)
-    
-#     # Prepare context and question for the LLM
-#     context = f"Document: {relevant_doc}"
-#     prompt = f"{context}\n\nQuestion: {query}"
-    
-#     # Query the LLM and return the response
-#     response = llm.query(prompt)
-#     return response
+import os
+import re
+import json
+import hashlib
+import threading
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# How each entity's records read as documents; missing fields render empty
+DOCUMENT_TEMPLATES = {
+    "commits": "Commit {sha} by {author} on {date}: {message}",
+    "issues": "Issue: {title} ({state}), opened {created_at}, closed {closed_at}",
+    "pull_requests": "Pull request #{number}: {title} by {user}, opened {created_at}, merged {merged_at}",
+    "reviews": "Review by {reviewer} of pull request {pr_id} on {submitted_at}: {body}",
+}
+
+# Field identifying a record of each entity (the keys syncs merge on)
+RECORD_KEYS = {"commits": "sha", "issues": "id", "pull_requests": "id", "reviews": "id"}
+
+# Rows scored per block during a search, so a memory-mapped index is never read at once
+SEARCH_BLOCK_ROWS = 65536
+
+
+class HashingEmbedder:
+    """
+    Model-free embeddings: words and word pairs are hashed into `dim` signed buckets and
+    the vector is L2-normalized. Stable across processes, so persisted vectors stay valid.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.signature = f"hashing:{dim}"
+
+    @staticmethod
+    @lru_cache(maxsize=200000)
+    def _bucket(feature, dim):
+        digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+        return digest % dim, 1.0 if digest >> 63 else -1.0
+
+    def _features(self, text):
+        words = re.findall(r"[a-z0-9_]+", str(text).lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                column, sign = self._bucket(feature, self.dim)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+        np.add.at(vectors, (rows, columns), signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class SentenceTransformerEmbedder:
+    """A small local sentence-transformers model (downloaded on first use), encoding in batches."""
+
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", batch_size=64):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.signature = f"sentence-transformers:{model_name}"
+
+    def encode(self, texts):
+        return self.model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def get_embedder(model_name=None):
+    """The sentence-transformers model_name, or the hashing embedder when none is given or it cannot load."""
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            print(f"Error loading embedding model {model_name}, using hashed embeddings: {e}")
+    return HashingEmbedder()
+
+
+def record_documents(entity, records):
+    """(record id, document text) for every record of an entity (a DataFrame or list of dicts)."""
+    if entity not in DOCUMENT_TEMPLATES:
+        return []
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+    key = RECORD_KEYS[entity]
+    if df.empty or key not in df.columns:
+        return []
+    fields = re.findall(r"{(\w+)}", DOCUMENT_TEMPLATES[entity])
+    df = df.reindex(columns=list(dict.fromkeys([key] + fields)))
+    documents = []
+    for row in df.itertuples(index=False):
+        values = {field: "" if pd.isna(value) else value for field, value in zip(df.columns, row)}
+        documents.append((f"{entity}:{values[key]}", DOCUMENT_TEMPLATES[entity].format(**values)))
+    return documents
+
+
+class VectorIndex:
+    """
+    Persistent embedding index over one repository's records, kept in index_dir:
+
+    - vectors.f32: float32 rows (one per record), memory-mapped for searches
+    - records.jsonl: id, entity, row, text digest and text of each record; a record
+      that changed is written again and its latest line wins
+    - meta.json: embedder signature and the committed row count and records size
+
+    Updates embed only records that are new or whose text changed, in batches, and
+    overwrite changed rows in place. An index built by another embedder is rebuilt.
+    One instance can be shared by several sessions: updates and searches take a lock,
+    so a search never sees a half-written update and two updates never interleave.
+    """
+
+    def __init__(self, index_dir, embedder=None, batch_size=256):
+        self.index_dir = index_dir
+        self.embedder = embedder or HashingEmbedder()
+        self.batch_size = batch_size
+        os.makedirs(index_dir, exist_ok=True)
+        self.vectors_path = os.path.join(index_dir, "vectors.f32")
+        self.records_path = os.path.join(index_dir, "records.jsonl")
+        self.meta_path = os.path.join(index_dir, "meta.json")
+        self._lock = threading.RLock()  # update_repo holds it across its per-entity updates
+        self._load()
+
+    def _load(self):
+        self.rows = {}  # record id -> (row, digest)
+        self.entities = []  # entity of each row
+        self.offsets = []  # byte offset of each row's latest record line
+        self.records_bytes = 0
+        meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        if meta.get("embedder") != self.embedder.signature:
+            # New index, or vectors from another embedder that cannot be compared
+            for path in (self.vectors_path, self.records_path):
+                open(path, "wb").close()
+            self._write_meta()
+            return
+
+        self.records_bytes = meta["records_bytes"]
+        with open(self.records_path, "rb") as f:
+            offset = 0
+            for line in f:
+                if offset >= self.records_bytes:
+                    break  # Written by an update that did not finish
+                record = json.loads(line)
+                if record["row"] == len(self.entities):
+                    self.entities.append(record["entity"])
+                    self.offsets.append(offset)
+                else:
+                    self.offsets[record["row"]] = offset
+                self.rows[record["id"]] = (record["row"], record["digest"])
+                offset += len(line)
+
+    def _write_meta(self):
+        meta = {"embedder": self.embedder.signature, "dim": self.embedder.dim,
+                "rows": len(self.entities), "records_bytes": self.records_bytes}
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def _vectors(self, mode="r"):
+        return np.memmap(self.vectors_path, dtype=np.float32, mode=mode, shape=(len(self), self.embedder.dim))
+
+    def update(self, entity, records):
+        """Embed the entity's new and changed records; returns how many were embedded."""
+        with self._lock:
+            return self._update(entity, records)
+
+    def _update(self, entity, records):
+        changed = {}
+        for record_id, text in record_documents(entity, records):
+            digest = hashlib.sha1(text.encode()).hexdigest()[:16]
+            if self.rows.get(record_id, (None, None))[1] != digest:
+                changed[record_id] = (record_id, text, digest)
+        if not changed:
+            return 0
+        changed = list(changed.values())
+
+        # Drop anything an interrupted update left past the committed state
+        os.truncate(self.vectors_path, len(self) * self.embedder.dim * 4)
+        os.truncate(self.records_path, self.records_bytes)
+
+        for start in range(0, len(changed), self.batch_size):
+            batch = changed[start:start + self.batch_size]
+            vectors = self.embedder.encode([text for _, text, _ in batch]).astype(np.float32)
+            lines, appended, rewritten = [], [], {}
+            for (record_id, text, digest), vector in zip(batch, vectors):
+                row = self.rows[record_id][0] if record_id in self.rows else len(self.entities) + len(appended)
+                if row >= len(self.entities):
+                    appended.append(vector)
+                else:
+                    rewritten[row] = vector
+                lines.append((row, record_id, digest,
+                              json.dumps({"id": record_id, "entity": entity, "row": row,
+                                          "digest": digest, "text": text}) + "\n"))
+            if rewritten:
+                stored = self._vectors("r+")
+                stored[list(rewritten)] = np.asarray(list(rewritten.values()))
+                stored.flush()
+                del stored
+            if appended:
+                with open(self.vectors_path, "ab") as f:
+                    f.write(np.asarray(appended, dtype=np.float32).tobytes())
+            with open(self.records_path, "ab") as f:
+                for row, record_id, digest, line in lines:
+                    if row == len(self.entities):
+                        self.entities.append(entity)
+                        self.offsets.append(self.records_bytes)
+                    else:
+                        self.offsets[row] = self.records_bytes
+                    self.rows[record_id] = (row, digest)
+                    encoded = line.encode()
+                    f.write(encoded)
+                    self.records_bytes += len(encoded)
+            self._write_meta()
+        return len(changed)
+
+    def update_repo(self, data):
+        """Index every supported entity of a synced repository (entity -> records); returns counts."""
+        with self._lock:
+            return {entity: self._update(entity, data[entity]) for entity in DOCUMENT_TEMPLATES if entity in data}
+
+    def search(self, query, k=5, entities=None):
+        """
+        The k records most similar to query (cosine similarity), best first, as dicts with
+        id, entity, score and text. entities restricts the search to those entity types.
+        """
+        with self._lock:
+            return self._search(query, k, entities)
+
+    def _search(self, query, k, entities):
+        if not len(self):
+            return []
+        query_vector = self.embedder.encode([query])[0]
+        vectors = self._vectors()
+        allowed = None
+        if entities:
+            allowed = np.isin(np.asarray(self.entities), list(entities))
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self), SEARCH_BLOCK_ROWS):
+            scores = vectors[start:start + SEARCH_BLOCK_ROWS] @ query_vector
+            if allowed is not None:
+                scores = np.where(allowed[start:start + SEARCH_BLOCK_ROWS], scores, -np.inf)
+            rows = np.arange(start, start + len(scores))
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+                rows, scores = rows[top], scores[top]
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(best_scores, -k)[-k:]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+
+        order = np.argsort(-best_scores)
+        results = []
+        with open(self.records_path, "rb") as f:
+            for row, score in zip(best_rows[order], best_scores[order]):
+                if not np.isfinite(score):
+                    continue
+                f.seek(self.offsets[row])
+                record = json.loads(f.readline())
+                results.append({"id": record["id"], "entity": record["entity"],
+                                "score": float(score), "text": record["text"]})
+        return results
+
+
+def format_results(results, max_chars=1000, max_record_chars=200):
+    """Retrieved records as prompt lines, each and all together cut to size."""
+    lines = []
+    total = 0
+    for result in results:
+        text = " ".join(result["text"].split())
+        line = f"- {text[:max_record_chars]}"
+        if total + len(line) > max_chars:
+            break
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
@@ -1,15 +1,32 @@
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
+from metrics.engine import to_utc
+from visualization.downsampling import compact_series, downsample_line, LINE_POINT_BUDGET, BAR_POINT_BUDGET
+
+# Period ordinal pandas uses for NaT
+NAT_ORDINAL = np.iinfo(np.int64).min
+
+# Bars get a value label only while there are few enough of them to read
+BAR_TEXT_LIMIT = 36
+
+BUCKET_LABELS = {"D": "Day", "W": "Week", "M": "Month", "Q": "Quarter"}
+
 
 class ChartBuilder:
-    def plot_commit_frequency(self, commit_frequency_df):
-        """Plot commit frequency using Plotly.""" 
+    def plot_commit_frequency(self, commit_frequency_df, date_range=None, max_points=LINE_POINT_BUDGET):
+        """
+        Plot monthly commit frequency using Plotly. When more than max_points months fall in
+        the visible date_range (start, end) they are summed into quarters, then LTTB-downsampled.
+        """
         if 'count' not in commit_frequency_df.columns:
             raise ValueError("DataFrame must contain a 'count' column for commit frequency.")
 
+        commit_frequency_df, bucket = compact_series(commit_frequency_df, 'date', ['count'], max_points, date_range)
+        commit_frequency_df = downsample_line(commit_frequency_df, 'date', 'count', max_points)
         fig = px.line(commit_frequency_df, x='date', y='count', title='Commit Frequency Over Time')
-        fig.update_layout(xaxis_title='Date', yaxis_title='Number of Commits')
+        fig.update_layout(xaxis_title=BUCKET_LABELS.get(bucket, 'Date'), yaxis_title='Number of Commits')
         return fig
 
     def plot_issue_resolution(self, resolution_time):
@@ -49,12 +66,19 @@ class ChartBuilder:
         return fig
 
 
-    def plot_issue_count_by_month(self, issue_counts_df):
-        """Plot stacked bar chart of issue counts and resolved issues by month and year.""" 
+    def plot_issue_count_by_month(self, issue_counts_df, date_range=None, max_bars=BAR_POINT_BUDGET):
+        """
+        Plot stacked bar chart of issue counts and resolved issues by month and year.
+        Only the visible date_range (start, end) is drawn, and more than max_bars months of it
+        are summed into quarters.
+        """
         try:
             if 'count' not in issue_counts_df.columns or 'resolved_issues' not in issue_counts_df.columns:
                 raise ValueError("DataFrame must contain 'count' and 'resolved_issues' columns.")
 
+            issue_counts_df, bucket = compact_series(
+                issue_counts_df, 'date', ['resolved_issues', 'unresolved_issues'], max_bars, date_range
+            )
             # Melt DataFrame for stacked bar plot
             melted_df = issue_counts_df.melt(id_vars='date', value_vars=['resolved_issues', 'unresolved_issues'],
                                              var_name='issue_type', value_name='issue_count')
@@ -62,8 +86,9 @@ class ChartBuilder:
             fig = px.bar(melted_df, x='date', y='issue_count', color='issue_type',
                          title='Issue Count and Resolution by Month and Year',
                          labels={'date': 'Month-Year', 'issue_count': 'Issue Count', 'issue_type': 'Issue Type'},
-                         text='issue_count')
-            fig.update_layout(xaxis_title='Month-Year', yaxis_title='Issue Count')
+                         text='issue_count' if len(issue_counts_df) <= BAR_TEXT_LIMIT else None)
+            x_title = 'Month-Year' if bucket is None else BUCKET_LABELS[bucket]
+            fig.update_layout(xaxis_title=x_title, yaxis_title='Issue Count')
             return fig
         except Exception as e:
             print(f"Error plotting issue count by month: {e}")
@@ -91,55 +116,146 @@ class ChartBuilder:
         fig.update_layout(title="Average Code Review Comments per Pull Request", yaxis_title="Comments")
         return fig
 
-    def visualize_metrics(self, pr_df, issue_df, period='M'):
-        """Visualize PR merge rates and issue resolution times on a dual-axis chart.""" 
-        # Process PR data
-        pr_df['created_at'] = pd.to_datetime(pr_df['created_at'])
-        pr_df.set_index('created_at', inplace=True)
-        
-        # Calculate PR merge rate for each period
-        pr_periodic = pr_df.resample(period).apply(lambda df: pd.Series({'merge_rate': calculate_merge_rate(df)}))
+    def plot_contributors(self, contributors_df, top=15):
+        """Grouped bars of merged pull requests, commits and reviews given by the top-ranked contributors."""
+        if 'contributor' not in contributors_df.columns:
+            raise ValueError("DataFrame must contain a 'contributor' column (see ContributorEngine.summary).")
+
+        top_df = contributors_df.head(top)
+        fig = go.Figure()
+        for column, label in (('prs_merged', 'PRs Merged'), ('commits', 'Commits'), ('reviews_given', 'Reviews Given')):
+            fig.add_trace(go.Bar(x=top_df['contributor'], y=top_df[column], name=label))
+        fig.update_layout(title=f'Top {len(top_df)} Contributors', barmode='group',
+                          xaxis_title='Contributor', yaxis_title='Count')
+        return fig
+
+    def plot_time_percentiles(self, percentiles_df, title):
+        """Monthly p50 / p90 / p99 durations (metrics.sketches.quantile_table) on a log scale of hours."""
+        if 'date' not in percentiles_df.columns:
+            raise ValueError("DataFrame must contain a 'date' column and percentile columns such as 'p50'.")
 
-        # Process issue data
-        issue_df['created_at'] = pd.to_datetime(issue_df['created_at'])
-        issue_df.set_index('created_at', inplace=True)
-        issue_periodic = issue_df.resample(period)['resolution_time'].mean()  # Average resolution time
+        fig = go.Figure()
+        for column in [c for c in percentiles_df.columns if c.startswith('p')]:
+            fig.add_trace(go.Scatter(x=percentiles_df['date'], y=percentiles_df[column], mode='lines+markers',
+                                     name=column))
+        # Tails are often orders of magnitude above the median
+        fig.update_layout(title=f'{title} Percentiles by Month', xaxis_title='Month', yaxis_title='Hours',
+                          yaxis_type='log')
+        return fig
+
+    def visualize_metrics(self, pr_df, issue_df, period='M', max_points=LINE_POINT_BUDGET):
+        """
+        Visualize PR merge rates and issue resolution times on a dual-axis chart, each line
+        LTTB-downsampled to max_points. period may be a list of resample periods (e.g.
+        ['W', 'M', 'Q']); the chart then gets a selector with one pair of lines per period.
+        The input frames are not modified.
+        """
+        periods = [period] if isinstance(period, str) else list(period)
+        series = periodic_metrics(pr_df, issue_df, periods)
 
         # Create a dual-axis plot
         fig = go.Figure()
+        for i, (pr_periodic, issue_periodic) in enumerate(series.values()):
+            # Fine periods over long histories are thinned to the point budget, keeping the line's shape
+            pr_periodic = downsample_line(pr_periodic.reset_index(), 'created_at', 'merge_rate', max_points)
+            issue_periodic = downsample_line(issue_periodic.reset_index(), 'created_at', 'resolution_time', max_points)
+
+            # PR Merge Rate (left axis)
+            fig.add_trace(go.Scatter(
+                x=pr_periodic['created_at'], y=pr_periodic['merge_rate'],
+                mode='lines+markers',  # Line + marker
+                name='PR Merge Rate',
+                line=dict(color='blue', dash='solid'),  # Solid blue line
+                marker=dict(symbol='circle', color='blue'),  # Circle markers
+                yaxis='y1',
+                visible=i == 0
+            ))
 
-        # PR Merge Rate (left axis)
-        fig.add_trace(go.Scatter(
-            x=pr_periodic.index, y=pr_periodic['merge_rate'],
-            mode='lines+markers',  # Line + marker
-            name='PR Merge Rate',
-            line=dict(color='blue', dash='solid'),  # Solid blue line
-            marker=dict(symbol='circle', color='blue'),  # Circle markers
-            yaxis='y1'
-        ))
-
-        # Issue Resolution Time (right axis)
-        fig.add_trace(go.Scatter(
-            x=issue_periodic.index, y=issue_periodic,
-            mode='lines+markers',  # Line + marker
-            name='Issue Resolution Time (hrs)',
-            line=dict(color='red', dash='dash'),  # Dashed red line
-            marker=dict(symbol='x', color='red'),  # X markers
-            yaxis='y2'
-        ))
+            # Issue Resolution Time (right axis)
+            fig.add_trace(go.Scatter(
+                x=issue_periodic['created_at'], y=issue_periodic['resolution_time'],
+                mode='lines+markers',  # Line + marker
+                name='Issue Resolution Time (hrs)',
+                line=dict(color='red', dash='dash'),  # Dashed red line
+                marker=dict(symbol='x', color='red'),  # X markers
+                yaxis='y2',
+                visible=i == 0
+            ))
 
         # Update layout for dual-axis
         fig.update_layout(
             title='PR Merge Rate and Issue Resolution Time',
             xaxis=dict(title='Date'),
-            yaxis=dict(title='PR Merge Rate (%)', titlefont=dict(color='blue'), tickfont=dict(color='blue')),
-            yaxis2=dict(title='Issue Resolution Time (hours)', titlefont=dict(color='red'), tickfont=dict(color='red'),
+            yaxis=dict(title=dict(text='PR Merge Rate (%)', font=dict(color='blue')), tickfont=dict(color='blue')),
+            yaxis2=dict(title=dict(text='Issue Resolution Time (hours)', font=dict(color='red')), tickfont=dict(color='red'),
                         overlaying='y', side='right'),
             legend=dict(x=0.1, y=1.1)
         )
+        if len(periods) > 1:
+            # Each button shows the two traces of its period
+            fig.update_layout(updatemenus=[dict(
+                type='buttons', direction='right', x=1, y=1.15, xanchor='right',
+                buttons=[
+                    dict(label=period, method='update',
+                         args=[{'visible': [j // 2 == i for j in range(2 * len(periods))]}])
+                    for i, period in enumerate(periods)
+                ]
+            )])
 
         return fig
 
+def _bucket_sums(timestamps, period, *values):
+    """
+    Per-period row counts and sums of each values array over the full range of periods
+    present, from integer period ordinals and np.bincount. Returns (period labels, counts,
+    *sums), labelled like DataFrame.resample: the period's last day at midnight UTC
+    (Sunday for 'W').
+    """
+    ordinals = to_utc(pd.Series(timestamps)).dt.tz_localize(None).dt.to_period(period).array.asi8
+    valid = ordinals != NAT_ORDINAL
+    ordinals = ordinals[valid]
+    if not len(ordinals):
+        return (pd.DatetimeIndex([], tz='UTC', name='created_at'), np.zeros(0)) + tuple(np.zeros(0) for _ in values)
+    first = ordinals.min()
+    offsets = ordinals - first
+    periods = pd.PeriodIndex.from_ordinals(np.arange(first, ordinals.max() + 1), freq=period)
+    index = periods.to_timestamp(how='end').normalize().tz_localize('UTC')
+    counts = np.bincount(offsets, minlength=len(index))
+    sums = tuple(np.bincount(offsets, weights=column[valid], minlength=len(index)) for column in values)
+    return (index.rename('created_at'), counts) + sums
+
+
+def periodic_metrics(pr_df, issue_df, periods=('M',)):
+    """
+    PR merge rate (% of PRs created in the period that were merged) and mean issue
+    resolution time per period ('D', 'W', 'M', 'Q', 'Y'), computed from grouped counts and
+    sums instead of a Python call per bucket. Returns {period: (merge rate frame,
+    resolution time series)}, both indexed by the resample label ('created_at') over every
+    period from the first to the last PR or issue; empty buckets have a merge rate of 0,
+    like calculate_merge_rate, and no resolution time. The inputs are not modified.
+    """
+    # Sentinels such as "Not Merged" count as not merged
+    merged = to_utc(pr_df['merged_at']).notna().to_numpy(dtype=float)
+    resolution_time = pd.to_numeric(issue_df['resolution_time'], errors='coerce').to_numpy(dtype=float)
+    resolved = ~np.isnan(resolution_time)
+
+    series = {}
+    for period in periods:
+        pr_index, pr_counts, merged_counts = _bucket_sums(pr_df['created_at'], period, merged)
+        merge_rate = np.divide(merged_counts * 100, pr_counts, out=np.zeros(len(pr_index)), where=pr_counts > 0)
+
+        # Unresolved issues still extend the range of buckets, like resample did
+        issue_index, _, resolved_counts, resolution_sums = _bucket_sums(
+            issue_df['created_at'], period, resolved.astype(float), np.where(resolved, resolution_time, 0.0)
+        )
+        mean_resolution = np.divide(resolution_sums, resolved_counts, out=np.full(len(issue_index), np.nan),
+                                    where=resolved_counts > 0)
+        series[period] = (
+            pd.DataFrame({'merge_rate': merge_rate}, index=pr_index),
+            pd.Series(mean_resolution, index=issue_index, name='resolution_time')
+        )
+    return series
+
 def calculate_merge_rate(pr_df):
     """Calculate the PR merge rate."""
     merged_count = pr_df['merged_at'].notna().sum()
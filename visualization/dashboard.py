@@ -1,53 +1,105 @@
 import streamlit as st
 import pandas as pd
+from dataclasses import dataclass
+from typing import Callable
 from PIL import Image
 import requests
+import base64
 from io import BytesIO
-from metrics.calculator import MetricsCalculator
+from metrics.engine import MetricsEngine
+from metrics.contributors import ContributorEngine
+from metrics.sketches import SKETCH_DEFINITIONS, contributions as sketch_contributions, merge_into, combine
+from metrics.sketches import quantile_table, quantile_summary
+from metrics.rollups import RepoRollups
+from metrics.cache import MetricsCache
+from query_interface.nlp_processor import build_metrics_context
+from query_interface.rag_model import format_results
 from visualization.charts import ChartBuilder
 
 
-@st.cache_data
-def load_data(repo_data, commits_data, issues_data, forks_data, pull_requests_data, reviews_data):
-    # Assuming `MetricsCalculator` and `ChartBuilder` are properly implemented
-    raw_data = {
+# Bump when the metrics computed by load_data change, so cached results are not reused
+METRIC_SET = "dashboard-v4"
+
+
+@st.cache_resource
+def get_metrics_cache(disk_dir=None):
+    """One MetricsCache per process, shared by every session (disk_dir adds a tier shared across processes)."""
+    return MetricsCache(disk_dir=disk_dir)
+
+
+def load_data(repo_data, commits_data, issues_data, forks_data, pull_requests_data, reviews_data, rollups=None,
+              version=None, cache=None, sketches=None):
+    """
+    Dashboard metrics for a repository. With a data version (metrics.cache.data_version)
+    results come from the metrics cache keyed by (full_name, version, METRIC_SET), so the
+    raw data is neither hashed nor recomputed when it has not changed. The normalized
+    pr_df / issue_df frames are cached apart from the metrics, in memory only, so they
+    are never pickled. sketches are the stored quantile sketches (SketchStore.load);
+    without them they are built from the data.
+    """
+    data = {
         "commits": commits_data,
-        "issues": issues_data
+        "issues": issues_data,
+        "pull_requests": pull_requests_data,
+        "reviews": reviews_data
     }
-    metrics_calculator = MetricsCalculator(raw_data)
-    commit_frequency = metrics_calculator.calculate_commit_frequency()
-    issue_resolution = metrics_calculator.calculate_issue_resolution_time()
-    issue_counts_by_month = metrics_calculator.calculate_issue_counts_by_month()
-    issue_pie_chart_data = metrics_calculator.calculate_issue_pie_chart_data()
-    pr_df = pd.DataFrame(pull_requests_data)
-    issue_df = pd.DataFrame(issues_data)
-    pr_merge_rate = metrics_calculator.calculate_pr_merge_rate(pr_df)
-    avg_comments_per_pr = metrics_calculator.calculate_code_review_metrics(reviews_data)
-
-    avg_stars = repo_data['stargazers_count']
-    avg_star_rating = min(avg_stars / 50, 5)
+    metrics_engine = None
+
+    def engine():
+        # One engine per call, shared by the metrics and the frames when both miss;
+        # with the stored rollups (RollupStore.load) the aggregates are read precomputed
+        nonlocal metrics_engine
+        if metrics_engine is None:
+            metrics_engine = MetricsEngine(data, rollups=RepoRollups(rollups) if rollups is not None else None)
+        return metrics_engine
+
+    def compute():
+        # Every entity is normalized once and all metrics are computed from those frames
+        metrics = engine().compute()
+
+        repo_sketches = sketches
+        if not repo_sketches:
+            repo_sketches = merge_into(sketch_contributions("issues", issues_data),
+                                       sketch_contributions("pull_requests", pull_requests_data))
+
+        avg_stars = repo_data['stargazers_count']
+        avg_star_rating = min(avg_stars / 50, 5)
+
+        return {
+            "commit_frequency": metrics.commit_frequency,
+            "issue_resolution": metrics.issue_resolution,
+            "issue_counts_by_month": metrics.issue_counts_by_month,
+            "issue_pie_chart_data": metrics.issue_pie_chart_data,
+            "pr_merge_rate": metrics.pr_merge_rate,
+            "avg_comments_per_pr": metrics.avg_comments_per_pr,
+            "avg_star_rating": avg_star_rating,
+            "contributors": ContributorEngine(data).summary(),
+            "time_percentiles": time_percentiles(repo_sketches)
+        }
 
+    def frames():
+        return {"pr_df": engine().pull_requests, "issue_df": engine().issues}
+
+    if version is None:
+        return {**compute(), **frames()}
+    cache = cache or get_metrics_cache()
+    metrics = cache.get_or_compute(repo_data['full_name'], version, METRIC_SET, compute)
+    return {**metrics, **cache.get_or_compute_frames(repo_data['full_name'], version, METRIC_SET, frames)}
+
+def time_percentiles(sketches):
+    """Per sketch (e.g. "issue_resolution_hours"): its overall quantiles and a table of them per month."""
     return {
-        "commit_frequency": commit_frequency,
-        "issue_resolution": issue_resolution,
-        "issue_counts_by_month": issue_counts_by_month,
-        "issue_pie_chart_data": issue_pie_chart_data,
-        "pr_df": pr_df,
-        "issue_df": issue_df,
-        "pr_merge_rate": pr_merge_rate,
-        "avg_comments_per_pr": avg_comments_per_pr,
-        "avg_star_rating": avg_star_rating
+        name: {"overall": quantile_summary(combine(sketches, name)), "by_month": quantile_table(sketches, name)}
+        for definitions in SKETCH_DEFINITIONS.values() for name, _, _ in definitions
     }
 
-def display_summary(
-    repo_data, user, avg_star_rating, forks_data, commit_frequency,
-    issue_resolution, issue_counts_by_month, issue_pie_chart_data,
-    pr_df, issue_df, pr_merge_rate, avg_comments_per_pr, chart_builder, nlp_processor
-):
-   # Process all the data first
 
-    # Summary Report content
-    summary_report_html = f"""
+def _has_enough_data(repo_data, commit_frequency):
+    return (repo_data['forks_count'] != 0 or repo_data['open_issues_count'] != 0) and len(commit_frequency) > 0 and repo_data['stargazers_count'] != 0
+
+
+def _build_summary_report(repo_data, user, avg_star_rating):
+    return f"""
     <div style="position:relative; border:1px solid #ccc; padding:16px; border-radius:8px;">
         <div style="position:absolute; top:16px; right:16px;">
             <img src="{user.avatar_url if user.avatar_url else 'https://via.placeholder.com/100'}" width="100" alt="Profile Image" style="border-radius:50%;"/>
@@ -80,84 +132,306 @@ def display_summary(
     </div>
     """
 
-    # Commit Frequency content
-    commit_frequency_chart = None
-    if (repo_data['forks_count'] != 0 or repo_data['open_issues_count'] != 0) and len(commit_frequency) > 0 and repo_data['stargazers_count'] != 0:
-        commit_frequency_chart = chart_builder.plot_commit_frequency(commit_frequency)
-
-    # Forks Details content
-    forks_chart = None
-    forks_table_html = None
-    if (repo_data['forks_count'] != 0 or repo_data['open_issues_count'] != 0) and len(commit_frequency) > 0 and repo_data['stargazers_count'] != 0:
-        forks_df = pd.DataFrame(forks_data)
-        forks_df['date'] = pd.to_datetime(forks_df['date'])
-        forks_df['month_year'] = forks_df['date'].dt.strftime('%Y-%m')
-        forks_monthly_count = forks_df.groupby('month_year').size().reset_index(name='count')
-        forks_chart = chart_builder.plot_fork_count_by_month(forks_monthly_count)
-
-        forks_df_display = pd.DataFrame({
-            'S.No': range(1, len(forks_df) + 1),
-            'Profile Image': [fork['profile_image'] if fork['profile_image'] else "https://via.placeholder.com/50" for fork in forks_data],
-            'Username': [fork['username'] for fork in forks_data],
-            'Date': [fork['date'].strftime('%Y-%m-%d') for fork in forks_data]
-        })
-
-        def image_formatter(image_url):
-            return f'<img src="{image_url}" width="50"/>'
-
-        forks_df_display['Profile Image'] = forks_df_display['Profile Image'].apply(image_formatter)
-        forks_table_html = forks_df_display.to_html(index=False, escape=False, border=1)
-
-    # Issues Count and Status content
-    issues_chart = None
-    issues_pie_chart = None
-    if (repo_data['forks_count'] != 0 or repo_data['open_issues_count'] != 0) and len(commit_frequency) > 0 and repo_data['stargazers_count'] != 0:
-        issues_chart = chart_builder.plot_issue_count_by_month(issue_counts_by_month)
-        issues_pie_chart = chart_builder.plot_issue_pie_chart(issue_pie_chart_data)
 
-    #side bar
-    st.sidebar.title("Navigation")
-    nav_option = st.sidebar.radio(
-        "Go to Section:",
-        ("Summary Report", "Commit Frequency", "Forks Details", "Issues Count and Status")
-    )
-    # Display content based on nav_option
-    if nav_option == "Summary Report":
-        st.header("Summary Report based on GitHub URL")
-        st.markdown(summary_report_html, unsafe_allow_html=True)
-
-    elif nav_option == "Commit Frequency":
-        if commit_frequency_chart:
-            st.header("Commit Frequency")
-            st.plotly_chart(commit_frequency_chart)
-        else:
-            st.write("Need more information to generate metrics.")
+def _render_summary_report(summary_report_html):
+    st.header("Summary Report based on GitHub URL")
+    st.markdown(summary_report_html, unsafe_allow_html=True)
 
-    elif nav_option == "Forks Details":
-        if forks_chart and forks_table_html:
-            st.header("Forks Count by overtime period")
-            st.plotly_chart(forks_chart)
 
-            st.header("Forking Project Other People Information")
-            st.write(forks_table_html, unsafe_allow_html=True)
-        else:
-            st.write("Need more information to generate metrics.")
+def _visible_range(series_df, key):
+    """
+    The (start, end) months picked on a range slider above a monthly chart, or None while
+    it spans the whole series (the memoized full-range chart is shown then).
+    """
+    if not isinstance(series_df, pd.DataFrame) or series_df.empty:
+        return None
+    dates = pd.to_datetime(series_df['date'])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    first, last = dates.min().to_pydatetime(), dates.max().to_pydatetime()
+    if first == last:
+        return None
+    picked = st.slider("Date range", min_value=first, max_value=last, value=(first, last), format="YYYY-MM", key=key)
+    return None if tuple(picked) == (first, last) else picked
+
+
+def _build_commit_frequency(repo_data, commit_frequency, chart_builder):
+    if not _has_enough_data(repo_data, commit_frequency):
+        return None
+    return commit_frequency, chart_builder.plot_commit_frequency(commit_frequency), chart_builder
+
+
+def _render_commit_frequency(content):
+    if content:
+        commit_frequency, commit_frequency_chart, chart_builder = content
+        st.header("Commit Frequency")
+        date_range = _visible_range(commit_frequency, "commit_frequency_range")
+        if date_range is not None:
+            # A narrower range fits the point budget at a finer bucket (months instead of quarters)
+            commit_frequency_chart = chart_builder.plot_commit_frequency(commit_frequency, date_range=date_range)
+        st.plotly_chart(commit_frequency_chart)
+    else:
+        st.write("Need more information to generate metrics.")
+
+
+FORK_PLACEHOLDER_IMAGE = "https://via.placeholder.com/50"
+FORK_SORT_COLUMNS = {"Date": "date", "Username": "username"}
+FORK_PAGE_SIZES = (25, 50, 100)
 
-    elif nav_option == "Issues Count and Status":
-        if issues_chart and issues_pie_chart:
-            st.header("Issues Count by Over Time period")
-            st.plotly_chart(issues_chart)
 
-            st.header("Issue Status Overview")
-            st.plotly_chart(issues_pie_chart)
+def _sized_avatar_url(image_url, size=50):
+    """GitHub avatar URLs accept a size parameter, so the browser downloads a thumbnail."""
+    if "avatars.githubusercontent.com" not in image_url:
+        return image_url
+    return f"{image_url}{'&' if '?' in image_url else '?'}s={size}"
+
+
+@st.cache_data(max_entries=2000, ttl=24 * 60 * 60, show_spinner=False)
+def fetch_avatar_thumbnail(image_url, size=50):
+    """Download an avatar once, shrink it with PIL and return it as a data URI (None on failure)."""
+    try:
+        response = requests.get(_sized_avatar_url(image_url, size), timeout=10)
+        response.raise_for_status()
+        image = Image.open(BytesIO(response.content)).convert("RGB")
+        image.thumbnail((size, size))
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+    except Exception as e:
+        print(f"Error fetching avatar {image_url}: {e}")
+        return None
+
+
+def filter_forks(forks_df, query="", sort_by="date", descending=True):
+    """Filter forks by username and sort them on the server, before a page is sliced off."""
+    if query:
+        forks_df = forks_df[forks_df['username'].str.contains(query, case=False, regex=False)]
+    return forks_df.sort_values(sort_by, ascending=not descending, kind="stable")
+
+
+def _fork_table_html(page_df, first_row, cache_thumbnails=False):
+    """HTML table of one page of forks; only these rows' avatars are requested, lazily."""
+    def image_formatter(image_url):
+        if pd.isna(image_url):
+            image_url = FORK_PLACEHOLDER_IMAGE
+        elif cache_thumbnails:
+            image_url = fetch_avatar_thumbnail(image_url) or _sized_avatar_url(image_url)
         else:
-            st.write("Need more information to generate metrics.")
+            image_url = _sized_avatar_url(image_url)
+        return f'<img src="{image_url}" width="50" height="50" loading="lazy"/>'
+
+    forks_df_display = pd.DataFrame({
+        'S.No': range(first_row, first_row + len(page_df)),
+        'Profile Image': page_df['profile_image'].map(image_formatter),
+        'Username': page_df['username'],
+        'Date': page_df['date'].dt.strftime('%Y-%m-%d')
+    })
+    return forks_df_display.to_html(index=False, escape=False, border=1)
+
+
+def _build_forks_details(repo_data, commit_frequency, forks_data, chart_builder):
+    if not _has_enough_data(repo_data, commit_frequency):
+        return None
+    forks_df = pd.DataFrame(forks_data)
+    forks_df['date'] = pd.to_datetime(forks_df['date'], utc=True)
+    forks_df['username'] = forks_df['username'].astype(str)
+    forks_df['month_year'] = forks_df['date'].dt.strftime('%Y-%m')
+    forks_monthly_count = forks_df.groupby('month_year').size().reset_index(name='count')
+    forks_chart = chart_builder.plot_fork_count_by_month(forks_monthly_count)
+    # The table itself is paged at render time from this frame
+    return forks_chart, forks_df[['username', 'date', 'profile_image']]
+
+
+def _render_forks_details(content):
+    if not content:
+        st.write("Need more information to generate metrics.")
+        return
+    forks_chart, forks_df = content
+    st.header("Forks Count by overtime period")
+    st.plotly_chart(forks_chart)
+
+    st.header("Forking Project Other People Information")
+    filter_col, sort_col, order_col, size_col = st.columns([3, 2, 2, 1])
+    query = filter_col.text_input("Filter by username", key="forks_query")
+    sort_label = sort_col.selectbox("Sort by", tuple(FORK_SORT_COLUMNS), key="forks_sort")
+    descending = order_col.selectbox("Order", ("Descending", "Ascending"), key="forks_order") == "Descending"
+    page_size = size_col.selectbox("Rows", FORK_PAGE_SIZES, index=1, key="forks_page_size")
+
+    matching = filter_forks(forks_df, query, FORK_SORT_COLUMNS[sort_label], descending)
+    page_count = max(-(-len(matching) // page_size), 1)
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, key="forks_page")
+    cache_thumbnails = st.checkbox("Cache avatar thumbnails", value=False, key="forks_thumbnails")
+
+    first_row = (page - 1) * page_size + 1
+    page_df = matching.iloc[first_row - 1:first_row - 1 + page_size]
+    st.caption(f"Showing {first_row}-{first_row + len(page_df) - 1} of {len(matching)} forks" if len(page_df) else "No matching forks")
+    st.write(_fork_table_html(page_df, first_row, cache_thumbnails), unsafe_allow_html=True)
+
+
+def _build_issues(repo_data, commit_frequency, issue_counts_by_month, issue_pie_chart_data, chart_builder):
+    if not _has_enough_data(repo_data, commit_frequency):
+        return None
+    return (chart_builder.plot_issue_count_by_month(issue_counts_by_month),
+            chart_builder.plot_issue_pie_chart(issue_pie_chart_data),
+            issue_counts_by_month, chart_builder)
+
+
+def _render_issues(content):
+    if content:
+        issues_chart, issues_pie_chart, issue_counts_by_month, chart_builder = content
+        st.header("Issues Count by Over Time period")
+        date_range = _visible_range(issue_counts_by_month, "issue_counts_range")
+        if date_range is not None:
+            issues_chart = chart_builder.plot_issue_count_by_month(issue_counts_by_month, date_range=date_range)
+        st.plotly_chart(issues_chart)
+
+        st.header("Issue Status Overview")
+        st.plotly_chart(issues_pie_chart)
+    else:
+        st.write("Need more information to generate metrics.")
+
+
+# Column labels of the contributors table
+CONTRIBUTOR_LABELS = {
+    "rank": "Rank", "contributor": "Contributor", "commits": "Commits", "prs_opened": "PRs Opened",
+    "prs_merged": "PRs Merged", "merge_hours": "Median Merge (h)", "first_review_hours": "Median First Review (h)",
+    "reviews_given": "Reviews Given", "prs_reviewed": "PRs Reviewed",
+    "review_turnaround_hours": "Median Review Turnaround (h)", "review_share": "Review Share (%)",
+}
+
+
+def _build_contributors(contributors, chart_builder):
+    if contributors is None or contributors.empty:
+        return None
+    table = contributors.assign(review_share=contributors['review_share'] * 100).round(1)
+    return chart_builder.plot_contributors(contributors), table.rename(columns=CONTRIBUTOR_LABELS)
+
+
+def _render_contributors(content):
+    if not content:
+        st.write("No pull request, review or commit data to break down by contributor.")
+        return
+    contributors_chart, contributors_table = content
+    st.header("Contributors")
+    st.plotly_chart(contributors_chart)
+    st.caption("Hours are medians. First review counts from a pull request's creation to its first review "
+               "by someone else; turnaround is how long a reviewer took to first respond to a pull request.")
+    st.dataframe(contributors_table, hide_index=True)
+
+
+# Titles of the duration distributions shown in the resolution and merge times section
+TIME_PERCENTILE_TITLES = {
+    "issue_resolution_hours": "Issue Resolution Time",
+    "pr_merge_hours": "Pull Request Merge Time",
+}
+
+
+def _build_time_percentiles(time_percentiles, chart_builder):
+    if not time_percentiles or not any(p["overall"]["count"] for p in time_percentiles.values()):
+        return None
+    content = []
+    for name, percentiles in time_percentiles.items():
+        if percentiles["overall"]["count"]:
+            title = TIME_PERCENTILE_TITLES.get(name, name)
+            content.append((title, percentiles["overall"], chart_builder.plot_time_percentiles(percentiles["by_month"], title)))
+    return content
+
+
+def _render_time_percentiles(content):
+    if not content:
+        st.write("No resolved issues or merged pull requests yet.")
+        return
+    st.header("Resolution and Merge Times")
+    st.caption("Percentiles in hours, read from quantile sketches (within 1% of the exact value).")
+    for title, overall, chart in content:
+        st.subheader(title)
+        columns = st.columns(3)
+        for column, percentile in zip(columns, ("p50", "p90", "p99")):
+            column.metric(percentile, f"{overall[percentile]:.1f} h")
+        st.plotly_chart(chart)
+
+
+@dataclass
+class Section:
+    """A sidebar section: build(**depends) makes its content, render(content) shows it."""
+    depends: tuple
+    build: Callable
+    render: Callable
+
+
+# Sidebar sections in display order. Only the selected one is built, from just the
+# display_summary arguments it depends on, and its content is memoized per repo.
+SECTIONS = {
+    "Summary Report": Section(
+        ("repo_data", "user", "avg_star_rating"), _build_summary_report, _render_summary_report
+    ),
+    "Commit Frequency": Section(
+        ("repo_data", "commit_frequency", "chart_builder"), _build_commit_frequency, _render_commit_frequency
+    ),
+    "Forks Details": Section(
+        ("repo_data", "commit_frequency", "forks_data", "chart_builder"), _build_forks_details, _render_forks_details
+    ),
+    "Issues Count and Status": Section(
+        ("repo_data", "commit_frequency", "issue_counts_by_month", "issue_pie_chart_data", "chart_builder"),
+        _build_issues, _render_issues
+    ),
+    "Contributors": Section(("contributors", "chart_builder"), _build_contributors, _render_contributors),
+    "Resolution and Merge Times": Section(
+        ("time_percentiles", "chart_builder"), _build_time_percentiles, _render_time_percentiles
+    ),
+}
+
+
+def display_summary(
+    repo_data, user, avg_star_rating, forks_data, commit_frequency,
+    issue_resolution, issue_counts_by_month, issue_pie_chart_data,
+    pr_df, issue_df, pr_merge_rate, avg_comments_per_pr, chart_builder, nlp_processor,
+    version=None, vector_index=None, contributors=None, time_percentiles=None
+):
+    """
+    Render the selected sidebar section. Built sections are kept in st.session_state
+    under (repo, data version, section), so switching back and forth only renders.
+    Free-form questions also get the records vector_index finds most relevant.
+    contributors and time_percentiles come from load_data.
+    """
+    dependencies = {
+        "repo_data": repo_data, "user": user, "avg_star_rating": avg_star_rating, "forks_data": forks_data,
+        "commit_frequency": commit_frequency, "issue_counts_by_month": issue_counts_by_month,
+        "issue_pie_chart_data": issue_pie_chart_data, "chart_builder": chart_builder, "contributors": contributors,
+        "time_percentiles": time_percentiles
+    }
+
+    #side bar
+    st.sidebar.title("Navigation")
+    nav_option = st.sidebar.radio("Go to Section:", tuple(SECTIONS))
+    section = SECTIONS[nav_option]
+
+    repo_key = (repo_data['full_name'], version)
+    built = st.session_state.setdefault("built_sections", {})
+    if any(key[:2] != repo_key for key in built):
+        built.clear()  # Another repository or newer data: drop the old figures
+    if repo_key + (nav_option,) not in built:
+        built[repo_key + (nav_option,)] = section.build(**{name: dependencies[name] for name in section.depends})
+    section.render(built[repo_key + (nav_option,)])
+
     # Optional: Natural Language Query section
     st.header("Natural Language Query")
     query = st.text_input("Ask a question (e.g., 'show commit frequency')", key="nlp_query_1")
     if query:
-        result = nlp_processor.process_query(query)
-        if result == 'commit_frequency':
+        result = nlp_processor.match_intent(query)
+        if result is None:
+            # Free-form questions are answered by the LLM, streamed as it writes and grounded in these metrics
+            context = build_metrics_context(repo_data, {
+                "commit_frequency": commit_frequency, "issue_resolution": issue_resolution,
+                "issue_counts_by_month": issue_counts_by_month, "pr_merge_rate": pr_merge_rate,
+                "avg_comments_per_pr": avg_comments_per_pr, "pr_df": pr_df
+            })
+            if vector_index is not None:
+                relevant = format_results(vector_index.search(query, k=8))
+                if relevant:
+                    context += "\nRelevant records:\n" + relevant
+            st.write_stream(nlp_processor.stream_answer(query, context))
+        elif result == 'commit_frequency':
             st.plotly_chart(chart_builder.plot_commit_frequency(commit_frequency))
         elif result == 'issue_resolution':
             st.write(f"Average issue resolution time: {issue_resolution:.2f} days")
@@ -166,4 +440,4 @@ def display_summary(
         elif result == 'code_review_metrics':
             st.write("Code review metrics not implemented yet.")
         else:
-            st.write(result)
\ No newline at end of file
+            st.write(result)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Bucket sizes from finest to coarsest, with their approximate length in days
+BUCKETS = (("D", 1), ("W", 7), ("M", 30.44), ("Q", 91.31))
+
+# Default number of points a line series and number of bars a bar chart may send to the browser
+LINE_POINT_BUDGET = 500
+BAR_POINT_BUDGET = 120
+
+
+def choose_bucket(start, end, max_points, grain="M"):
+    """
+    Finest bucket ("D", "W", "M" or "Q") that covers [start, end] in at most max_points
+    buckets and is not finer than the series' own grain.
+    """
+    span_days = max((pd.Timestamp(end) - pd.Timestamp(start)) / pd.Timedelta(days=1), 1)
+    buckets = [bucket for bucket, _ in BUCKETS]
+    for bucket, days in BUCKETS[buckets.index(grain):]:
+        if span_days / days <= max_points:
+            return bucket
+    return BUCKETS[-1][0]
+
+
+def _naive(dates):
+    """A Timestamp or datetime Series with its time zone dropped (wall time kept), as aggregate does."""
+    if isinstance(dates, pd.Series):
+        return dates.dt.tz_localize(None) if dates.dt.tz is not None else dates
+    return dates.tz_localize(None) if dates.tz is not None else dates
+
+
+def aggregate(df, date_column, value_columns, bucket, how="sum"):
+    """Re-bucket a time series: one row per bucket with value_columns summed (or averaged)."""
+    dates = _naive(pd.to_datetime(df[date_column]))
+    grouped = df[value_columns].groupby(dates.dt.to_period(bucket).dt.start_time)
+    result = grouped.sum() if how == "sum" else grouped.mean()
+    return result.rename_axis(date_column).reset_index()
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of at most `threshold` points that keep the
+    visual shape of the line (peaks and dips survive, unlike plain decimation).
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    # Interior points are split into threshold - 2 buckets of (almost) equal size
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_line(df, date_column, value_column, max_points=LINE_POINT_BUDGET):
+    """Rows of a line series reduced with LTTB to at most max_points, in date order."""
+    df = df.dropna(subset=[value_column]).sort_values(date_column)
+    if len(df) <= max_points:
+        return df
+    dates = pd.to_datetime(df[date_column])
+    x = dates.astype("int64").to_numpy()
+    return df.iloc[lttb(x, df[value_column].to_numpy(), max_points)]
+
+
+def compact_series(df, date_column, value_columns, max_points, date_range=None, how="sum", grain="M"):
+    """
+    Fit a time series into a point budget: restrict it to the visible date_range and, only
+    if more than max_points rows remain, re-bucket it into the finest bucket coarser than
+    its grain (the engine and rollup series are monthly) that fits.
+    Returns (frame, bucket), bucket being None when the series was left as it is.
+    """
+    if df.empty:
+        return df, None
+    if date_range is not None:
+        # Compared as naive wall times, like aggregate, so tz-aware and naive dates or bounds mix
+        dates = _naive(pd.to_datetime(df[date_column]))
+        start, end = (_naive(pd.Timestamp(bound)) for bound in date_range)
+        df = df[(dates >= start) & (dates <= end)]
+    if len(df) <= max_points:
+        return df, None
+    dates = pd.to_datetime(df[date_column])
+    bucket = choose_bucket(dates.min(), dates.max(), max_points, grain)
+    if bucket == grain:
+        return df, None
+    return aggregate(df, date_column, value_columns, bucket, how), bucket